@@ -0,0 +1,4 @@
+# coding: utf-8
+"""
+Performance benchmarks for pyanyapi. Every module can be executed with ``python -m benchmarks.<name>``.
+"""
@@ -0,0 +1,65 @@
+# coding: utf-8
+"""
+Memory, retained by many parsing results: dictionaries vs compact records, and interfaces before and after release.
+"""
+import gc
+import tracemalloc
+
+from pyanyapi.parsers import JSONParser, RegExpParser
+
+from .corpus import generate
+
+
+def build_parsers():
+    return (
+        ('json', lambda: JSONParser(dict(('field_%s' % i, 'items > %s > name' % i) for i in range(10))), 'json'),
+        ('regexp', lambda: RegExpParser(dict(
+            ('field_%s' % i, r'request_id=(%s\d*)' % i) for i in range(10)
+        )), 'text'),
+    )
+
+
+def measure(func, count):
+    """
+    Memory, retained by `count` results of `func`, in bytes per result. Every result is built from its own document.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        results = [func(index) for index in range(count)]
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del results
+    return retained / float(count)
+
+
+def main(count=5000):
+    print('%s results retained, bytes per result' % count)
+    for name, factory, kind in build_parsers():
+        default, compact = factory(), factory()
+        compact.compact = True
+
+        def parse_all(parser):
+            return lambda index: parser.parse_all(generate(kind, 'small', index))
+
+        def interface(parser):
+
+            def inner(index):
+                parsed = parser.parse(generate(kind, 'small', index))
+                parsed.parse_all()
+                return parsed
+
+            return inner
+
+        print('%-7s parse_all: dict %8.0f, record %8.0f   interface: default %8.0f, compact %8.0f' % (
+            name,
+            measure(parse_all(default), count),
+            measure(parse_all(compact), count),
+            measure(interface(default), count),
+            measure(interface(compact), count),
+        ))
+
+
+if __name__ == '__main__':
+    main()
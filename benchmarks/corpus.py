@@ -0,0 +1,104 @@
+# coding: utf-8
+"""
+Synthetic documents for benchmarks. Every generator is deterministic - the same number of records
+and seed always give the same document, so results are comparable between versions.
+"""
+import json
+import random
+
+import yaml
+
+
+# Number of records in documents of every size
+SIZES = {
+    'small': 10,
+    'medium': 1000,
+    'huge': 100000,
+}
+WORDS = ('alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'theta', 'kappa', 'lambda', 'sigma')
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+
+def generate_records(count, seed=0):
+    rnd = random.Random(seed)
+    return [
+        {
+            'id': index,
+            'name': ' '.join(rnd.choice(WORDS) for _ in range(3)),
+            'price': round(rnd.uniform(1, 1000), 2),
+            'tags': [rnd.choice(WORDS) for _ in range(rnd.randint(1, 4))],
+        }
+        for index in range(count)
+    ]
+
+
+def generate_html(count, seed=0):
+    items = ''.join(
+        '<li class="item" id="item-%(id)s"><a href="/items/%(id)s">%(name)s</a>'
+        '<span class="price">%(price)s</span></li>' % record
+        for record in generate_records(count, seed)
+    )
+    return (
+        '<html><head><title>Catalog</title></head><body>'
+        '<h1>Catalog</h1><ul class="items">%s</ul><p class="footer">Total: %s</p></body></html>' % (items, count)
+    )
+
+
+def generate_xml(count, seed=0):
+    items = ''.join(
+        '<item id="%(id)s"><name>%(name)s</name><price>%(price)s</price></item>' % record
+        for record in generate_records(count, seed)
+    )
+    return '<?xml version="1.0" encoding="UTF-8"?><catalog><total>%s</total>%s</catalog>' % (count, items)
+
+
+def generate_data(count, seed=0):
+    return {'meta': {'status': 'ok', 'total': count}, 'items': generate_records(count, seed)}
+
+
+def generate_json(count, seed=0):
+    return json.dumps(generate_data(count, seed))
+
+
+def generate_yaml(count, seed=0):
+    return yaml.safe_dump(generate_data(count, seed))
+
+
+def generate_ajax(count, seed=0):
+    return json.dumps({'status': 'ok', 'content': generate_html(count, seed)})
+
+
+def generate_csv(count, seed=0):
+    lines = ['id,name,price']
+    lines.extend('%(id)s,%(name)s,%(price)s' % record for record in generate_records(count, seed))
+    return '\r\n'.join(lines)
+
+
+def generate_text(count, seed=0):
+    rnd = random.Random(seed)
+    lines = [
+        '2016-08-09 12:%02d:%02d %s request_id=%s user=%s took=%sms' % (
+            index // 60 % 60, index % 60, rnd.choice(LEVELS), index, rnd.choice(WORDS), rnd.randint(1, 5000)
+        )
+        for index in range(count)
+    ]
+    lines.append('2016-08-09 13:00:00 INFO shutdown status=done')
+    return '\n'.join(lines)
+
+
+GENERATORS = {
+    'html': generate_html,
+    'xml': generate_xml,
+    'json': generate_json,
+    'yaml': generate_yaml,
+    'ajax': generate_ajax,
+    'csv': generate_csv,
+    'text': generate_text,
+}
+
+
+def generate(kind, size, seed=0):
+    """
+    Document of given kind ('html', 'json', ...) and size ('small', 'medium', 'huge').
+    """
+    return GENERATORS[kind](SIZES[size], seed)
@@ -0,0 +1,41 @@
+# coding: utf-8
+"""
+Time of importing pyanyapi modules in a fresh interpreter and heavy dependencies, loaded by them.
+"""
+import ast
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ('lxml', 'yaml', 'csv', 'json', 'ujson', 'orjson', 'sqlite3', 'logging')
+MODULES = ('pyanyapi', 'pyanyapi.parsers', 'pyanyapi.resultcache')
+SCRIPT = '''
+import sys
+from timeit import default_timer
+start = default_timer()
+import %s
+duration = default_timer() - start
+print([duration, sorted(name for name in %r if name in sys.modules)])
+'''
+
+
+def measure(module, repeat):
+    """
+    The best import time of `module` in seconds and heavy modules, it loads.
+    """
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', SCRIPT % (module, HEAVY_MODULES)])
+        duration, loaded = ast.literal_eval(output.decode('utf-8'))
+        timings.append(duration)
+    return min(timings), loaded
+
+
+def main(repeat=10):
+    for module in MODULES:
+        duration, loaded = measure(module, repeat)
+        print('%-22s %7.2f ms   loaded: %s' % (module, duration * 1000, ', '.join(loaded) or '-'))
+
+
+if __name__ == '__main__':
+    main()
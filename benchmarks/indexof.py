@@ -0,0 +1,40 @@
+# coding: utf-8
+"""
+``IndexOfParser`` with growing number of settings: substring search per setting vs one automaton scan.
+"""
+import random
+import string
+import timeit
+
+from pyanyapi.automaton import ahocorasick
+from pyanyapi.parsers import IndexOfParser
+
+
+def generate_content(size, seed=0):
+    rnd = random.Random(seed)
+    alphabet = string.ascii_lowercase + ' ' * 6
+    return ''.join(rnd.choice(alphabet) for _ in range(size))
+
+
+def generate_settings(count, seed=1):
+    rnd = random.Random(seed)
+    return dict(
+        ('has_%s' % i, ''.join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(5, 9))))
+        for i in range(count)
+    )
+
+
+def main(size=1000000, counts=(10, 50, 100, 500, 1000)):
+    content = generate_content(size)
+    print('content: %s chars, C automaton: %s' % (size, 'yes' if ahocorasick else 'no'))
+    for count in counts:
+        timings = []
+        for threshold in (None, 1):
+            parser = IndexOfParser(generate_settings(count))
+            parser.automaton_threshold = threshold
+            timings.append(min(timeit.repeat(lambda: parser.parse_all(content), number=1, repeat=3)))
+        print('%5s settings: per setting %8.4f s, automaton %8.4f s' % ((count, ) + tuple(timings)))
+
+
+if __name__ == '__main__':
+    main()
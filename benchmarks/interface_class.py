@@ -0,0 +1,36 @@
+# coding: utf-8
+"""
+Per-call overhead of ``BaseParser.parse``: generating interface class on every call vs re-using cached one.
+"""
+import timeit
+
+from pyanyapi.decorators import interface_property
+from pyanyapi.parsers import RegExpParser
+
+
+class Parser(RegExpParser):
+    settings = dict(('field_%s' % i, r'(\d+)') for i in range(20))
+
+    @interface_property
+    def combined(self):
+        return self.field_0 + self.field_1
+
+
+def parse_uncached(parser, content):
+    """
+    Reproduces previous behaviour - new interface class for every call.
+    """
+    parser._interface_cache = None
+    return parser.parse(content)
+
+
+def main(number=20000):
+    parser = Parser()
+    content = 'value 123'
+    for name, func in (('before', parse_uncached), ('after', Parser.parse)):
+        elapsed = min(timeit.repeat(lambda: func(parser, content), number=number, repeat=3))
+        print('%-6s %8.2f us per call' % (name, elapsed / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
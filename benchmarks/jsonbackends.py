@@ -0,0 +1,34 @@
+# coding: utf-8
+"""
+``JSONParser`` with every installed JSON backend over text, bytes and memoryview documents of different sizes.
+"""
+import timeit
+
+from pyanyapi.jsonbackends import BACKENDS, detect_backend
+from pyanyapi.parsers import JSONParser
+
+from .corpus import SIZES, generate
+from .scenarios import build_json_settings
+
+
+def main(sizes=('small', 'medium', 'huge'), repeat=3):
+    print('default backend: %s' % detect_backend().name)
+    for size in sizes:
+        text = generate('json', size)
+        binary = text.encode('utf-8')
+        contents = (('str', text), ('bytes', binary), ('memoryview', memoryview(binary)))
+        number = max(1, 10000 // SIZES[size])
+        print('%s: %s records, %.1f KB' % (size, SIZES[size], len(binary) / 1024.0))
+        for name in sorted(BACKENDS):
+            parser = JSONParser(build_json_settings(), backend=name)
+            timings = [
+                min(timeit.repeat(lambda: parser.parse_all(content), number=number, repeat=repeat)) / number
+                for _, content in contents
+            ]
+            print('  %-8s' % name + ''.join(
+                '  %s %9.3f ms' % (kind, timing * 1000) for (kind, _), timing in zip(contents, timings)
+            ))
+
+
+if __name__ == '__main__':
+    main()
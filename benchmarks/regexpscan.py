@@ -0,0 +1,44 @@
+# coding: utf-8
+"""
+``RegExpParser.parse_all`` over short documents, where fields go in different order: pattern per setting vs
+single pass scan.
+"""
+import random
+import timeit
+
+from pyanyapi.parsers import RegExpParser
+
+
+def generate_documents(count, fields, seed=0):
+    rnd = random.Random(seed)
+    documents = []
+    for index in range(count):
+        order = list(range(fields))
+        rnd.shuffle(order)
+        documents.append(' '.join('alpha%s=value%s' % (field, index) for field in order))
+    return documents
+
+
+def main(count=200, fields=(5, 30, 100), repeat=3):
+    for number in fields:
+        documents = generate_documents(count, number)
+        settings = dict(('alpha%s' % index, r'alpha%s=(\w+)' % index) for index in range(number))
+        timings = []
+        for single_pass in (False, True):
+            parser = RegExpParser(settings)
+            parser.single_pass = single_pass
+            # Results cache would hide repeated parsing
+            parser.cache_size = 0
+
+            def parse_all():
+                for document in documents:
+                    parser.parse_all(document)
+
+            timings.append(min(timeit.repeat(parse_all, number=1, repeat=repeat)) / count)
+        print('%5s settings: per setting %8.1f us, single pass %8.1f us' % (
+            (number, ) + tuple(timing * 1000000 for timing in timings)
+        ))
+
+
+if __name__ == '__main__':
+    main()
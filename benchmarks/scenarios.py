@@ -0,0 +1,132 @@
+# coding: utf-8
+"""
+Benchmark scenarios - every public parser over a document of matching kind.
+"""
+from pyanyapi.decorators import interface_property
+from pyanyapi.parsers import (
+    AJAXParser,
+    CombinedParser,
+    CSVParser,
+    HTMLParser,
+    IndexOfParser,
+    JSONParser,
+    RegExpParser,
+    XMLObjectifyParser,
+    XMLParser,
+    YAMLParser,
+)
+
+
+class ItemParser(HTMLParser):
+    settings = {
+        'href': 'string(//a/@href)',
+        'name': 'string(//a/text())',
+        'price': 'string(//span[@class="price"]/text())',
+    }
+
+
+class CatalogParser(HTMLParser):
+    settings = {
+        'title': 'string(//title/text())',
+        'items': {
+            'base': '//li[@class="item"]',
+            'parser': ItemParser,
+        },
+    }
+
+
+class LogParser(CombinedParser):
+    parsers = (
+        RegExpParser({'first_error': r'ERROR request_id=(\d+)', 'shutdown': r'shutdown status=(\w+)'}),
+        IndexOfParser({'has_errors': 'ERROR', 'has_shutdown': 'shutdown'}),
+    )
+
+    @interface_property
+    def summary(self):
+        return '%s:%s' % (self.first_error, self.shutdown)
+
+
+def build_json_settings():
+    return {
+        'status': 'meta > status',
+        'total': 'meta > total',
+        'first': 'items > 0 > name',
+        'last': 'items > -1 > name',
+        'prices': {'base': 'items', 'children': 'price'},
+    }
+
+
+class Scenario(object):
+    """
+    Parser factory and kind of documents, it is applied to. Parser's `method` is called with document
+    as the only argument. When `method` is None, factory returns function to benchmark itself.
+    """
+
+    def __init__(self, name, kind, factory, method='parse_all'):
+        self.name = name
+        self.kind = kind
+        self.factory = factory
+        self.method = method
+
+    def prepare(self):
+        """
+        Builds parser and returns function to benchmark.
+        """
+        parser = self.factory()
+        if self.method is None:
+            return parser
+        return getattr(parser, self.method)
+
+
+def objectify_factory():
+    parser = XMLObjectifyParser()
+
+    def run(content):
+        parsed = parser.parse(content)
+        return parsed.total, parsed.item.name
+
+    return run
+
+
+def iterparse_factory():
+    parser = XMLParser({'name': 'string(/item/name)', 'price': 'number(/item/price)'})
+    return lambda content: list(parser.iterparse(content.encode('utf-8'), 'item'))
+
+
+SCENARIOS = [
+    Scenario('html', 'html', lambda: HTMLParser({
+        'title': 'string(//title/text())',
+        'names': '//li/a/text()',
+        'footer': 'string(//p[@class="footer"])',
+    })),
+    Scenario('html_subparser', 'html', CatalogParser),
+    Scenario('xml', 'xml', lambda: XMLParser({
+        'total': 'string(//total)',
+        'names': '//item/name/text()',
+        'first': 'string(//item[1]/name)',
+    })),
+    Scenario('xml_objectify', 'xml', objectify_factory, method=None),
+    Scenario('xml_iterparse', 'xml', iterparse_factory, method=None),
+    Scenario('json', 'json', lambda: JSONParser(build_json_settings())),
+    Scenario('json_streaming', 'json', lambda: JSONParser({
+        'status': 'meta > status',
+        'total': 'meta > total',
+        'first': 'items > 0 > name',
+    }, streaming=True)),
+    Scenario('yaml', 'yaml', lambda: YAMLParser(build_json_settings())),
+    Scenario('ajax', 'ajax', lambda: AJAXParser({
+        'title': 'content > string(//title/text())',
+        'names': 'content > //li/a/text()',
+    })),
+    Scenario('regexp', 'text', lambda: RegExpParser(dict(
+        ('level_%s' % level.lower(), r'%s request_id=(\d+)' % level)
+        for level in ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+    ))),
+    Scenario('csv', 'csv', lambda: CSVParser({'first': '1:name', 'tenth': '10:price', 'header': '0:0'})),
+    Scenario('indexof', 'text', lambda: IndexOfParser(dict(
+        ('has_%s' % index, 'user=%s took=%s' % (word, index)) for index, word in enumerate(
+            ('alpha', 'beta', 'gamma', 'delta', 'epsilon') * 40
+        )
+    ))),
+    Scenario('combined', 'text', LogParser),
+]
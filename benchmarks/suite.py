@@ -0,0 +1,215 @@
+# coding: utf-8
+"""
+Runs benchmark scenarios over synthetic documents of different sizes and reports throughput,
+latency percentiles and peak memory. Results could be saved as JSON and compared with results
+of another version:
+
+    python -m benchmarks.suite --sizes small,medium --output before.json
+    python -m benchmarks.suite --sizes small,medium --output after.json
+    python -m benchmarks.suite --compare before.json after.json
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from timeit import default_timer
+
+import pyanyapi
+from pyanyapi._compat import etree
+from pyanyapi.instrumentation import percentile
+
+from .corpus import generate
+from .scenarios import SCENARIOS
+
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def get_scenario(name):
+    for scenario in SCENARIOS:
+        if scenario.name == name:
+            return scenario
+    raise ValueError('Unknown scenario: %s' % name)
+
+
+def measure_latency(func, content, min_time, min_iterations):
+    """
+    Calls function until `min_time` seconds and `min_iterations` calls are reached. Returns durations.
+    """
+    func(content)  # Warm up
+    durations = []
+    started = default_timer()
+    while len(durations) < min_iterations or default_timer() - started < min_time:
+        start = default_timer()
+        func(content)
+        durations.append(default_timer() - start)
+    return durations
+
+
+def measure_python_memory(func, content):
+    """
+    Peak size of memory blocks, allocated by Python during single call. Memory of C libraries,
+    like libxml2, is not traced.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(content)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def max_rss():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def rss_worker(name, size):
+    scenario = get_scenario(name)
+    func = scenario.prepare()
+    content = generate(scenario.kind, size)
+    before = max_rss()
+    func(content)
+    return max_rss() - before
+
+
+def measure_rss(name, size):
+    """
+    Growth of peak RSS during single call in a fresh process, including memory of C libraries.
+    """
+    if resource is None:
+        return None
+    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(rss_worker, name, size).result()
+
+
+def run_scenario(scenario, size, min_time=1.0, min_iterations=5, memory=True):
+    content = generate(scenario.kind, size)
+    func = scenario.prepare()
+    durations = sorted(measure_latency(func, content, min_time, min_iterations))
+    total = sum(durations)
+    megabytes = len(content.encode('utf-8')) / 1024.0 / 1024.0
+    result = {
+        'scenario': scenario.name,
+        'size': size,
+        'bytes': len(content.encode('utf-8')),
+        'iterations': len(durations),
+        'throughput': {
+            'documents_per_second': len(durations) / total,
+            'megabytes_per_second': megabytes * len(durations) / total,
+        },
+        'latency': {
+            'mean': total / len(durations),
+            'p50': percentile(durations, 0.5),
+            'p90': percentile(durations, 0.9),
+            'p99': percentile(durations, 0.99),
+            'max': durations[-1],
+        },
+    }
+    if memory:
+        result['memory'] = {
+            'python_peak_bytes': measure_python_memory(func, content),
+            'rss_growth_bytes': measure_rss(scenario.name, size),
+        }
+    return result
+
+
+def get_environment():
+    return {
+        'pyanyapi': pyanyapi.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'lxml': '.'.join(map(str, etree.LXML_VERSION)) if etree else None,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def run(scenarios, sizes, min_time=1.0, min_iterations=5, memory=True, report=None):
+    results = []
+    for scenario in scenarios:
+        for size in sizes:
+            result = run_scenario(scenario, size, min_time, min_iterations, memory)
+            if report is not None:
+                report(result)
+            results.append(result)
+    return {'environment': get_environment(), 'results': results}
+
+
+def format_result(result):
+    line = '%-16s %-7s %10.1f docs/s %8.2f MB/s  p50 %9.3f ms  p99 %9.3f ms' % (
+        result['scenario'],
+        result['size'],
+        result['throughput']['documents_per_second'],
+        result['throughput']['megabytes_per_second'],
+        result['latency']['p50'] * 1000,
+        result['latency']['p99'] * 1000,
+    )
+    memory = result.get('memory')
+    if memory:
+        line += '  python %8.1f KB' % (memory['python_peak_bytes'] / 1024.0)
+        if memory['rss_growth_bytes'] is not None:
+            line += '  rss %8.1f KB' % (memory['rss_growth_bytes'] / 1024.0)
+    return line
+
+
+def compare(before, after):
+    """
+    Yields lines with ratios of median latencies and peak memory of two runs.
+    """
+    previous = dict(((result['scenario'], result['size']), result) for result in before['results'])
+    yield '%s -> %s' % (before['environment']['pyanyapi'], after['environment']['pyanyapi'])
+    for result in after['results']:
+        old = previous.get((result['scenario'], result['size']))
+        if old is None:
+            continue
+        line = '%-16s %-7s p50 x%.2f' % (
+            result['scenario'], result['size'], result['latency']['p50'] / old['latency']['p50']
+        )
+        if 'memory' in result and 'memory' in old and old['memory']['python_peak_bytes']:
+            line += '  python memory x%.2f' % (
+                result['memory']['python_peak_bytes'] / float(old['memory']['python_peak_bytes'])
+            )
+        yield line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', help='Comma-separated scenario names, all by default')
+    parser.add_argument('--sizes', default='small,medium', help='Comma-separated sizes: small, medium, huge')
+    parser.add_argument('--min-time', type=float, default=1.0, help='Minimal time per scenario and size, seconds')
+    parser.add_argument('--min-iterations', type=int, default=5)
+    parser.add_argument('--no-memory', action='store_true', help='Skip memory measurements')
+    parser.add_argument('--output', help='Path to save results as JSON')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two saved results')
+    args = parser.parse_args(argv)
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            for line in compare(json.load(before), json.load(after)):
+                print(line)
+        return
+    if args.scenarios:
+        scenarios = [get_scenario(name) for name in args.scenarios.split(',')]
+    else:
+        scenarios = SCENARIOS
+    results = run(
+        scenarios, args.sizes.split(','), args.min_time, args.min_iterations, not args.no_memory,
+        report=lambda result: print(format_result(result)),
+    )
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
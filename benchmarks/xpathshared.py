@@ -0,0 +1,60 @@
+# coding: utf-8
+"""
+``HTMLParser`` with settings, which share the same base and prefixes: shared evaluation vs separate one.
+"""
+import timeit
+
+from pyanyapi.interfaces import XPathInterface
+from pyanyapi.parsers import HTMLParser
+
+
+SETTINGS = {
+    'names': {'base': "//div[@class='product']", 'children': 'h2/text()'},
+    'prices': {'base': "//div[@class='product']", 'children': "span[@class='price']/text()"},
+    'skus': {'base': "//div[@class='product']", 'children': "span[@class='sku']/text()"},
+    'products': "//div[@class='product']",
+    'links': "//div[@class='product']/a/@href",
+    'spans': "//div[@class='product']/span",
+}
+
+
+def generate_content(products, filler):
+    rows = ''.join(
+        '<div class="product"><h2>Product %s</h2><span class="price">%s</span><span class="sku">s%s</span>'
+        '<a href="/%s">more</a></div>' % (index, index, index, index) for index in range(products)
+    )
+    return '<html><body>%s%s</body></html>' % ('<p>filler</p>' * filler, rows)
+
+
+class SeparateInterface(XPathInterface):
+    """
+    Reproduces previous behaviour - every expression is evaluated on its own.
+    """
+
+    @classmethod
+    def share_queries(cls):
+        pass
+
+
+def main(products=(100, 2000), filler=20000, repeat=5):
+    for count in products:
+        content = generate_content(count, filler)
+        parsed_content = HTMLParser().parse(content).parsed_content
+        print('%s products, %s other elements' % (count, filler))
+        for name, interface_class in (('separate', SeparateInterface), ('shared', XPathInterface)):
+            parser = HTMLParser(SETTINGS)
+            parser.interface_class = interface_class
+            # Results cache would hide repeated evaluation
+            parser.cache_size = 0
+
+            def parse_all():
+                parsed = parser.parse(content)
+                parsed._parsed_content = parsed_content
+                return parsed.parse_all()
+
+            timing = min(timeit.repeat(parse_all, number=10, repeat=repeat)) / 10
+            print('  %-8s %8.2f ms' % (name, timing * 1000))
+
+
+if __name__ == '__main__':
+    main()
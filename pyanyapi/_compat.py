@@ -1,24 +1,94 @@
 # coding: utf-8
-
+from importlib import import_module
 
 try:
-    from lxml import etree, objectify
+    from importlib.util import find_spec
+except ImportError:  # Python 2
+    find_spec = None
+
+
+def is_installed(name):
+    """
+    Checks if module could be imported without importing it.
+    """
+    if find_spec is not None:
+        try:
+            return find_spec(name) is not None
+        except (ImportError, ValueError):
+            return False
+    try:
+        import_module(name)
+    except ImportError:
+        return False
+    return True
+
+
+class LazyModule(object):
+    """
+    Imports module on first attribute access, so heavy dependencies are loaded only by parsers, which need them.
+    It is falsy, when the module is not installed.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = import_module(self._name)
+        return self._module
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __bool__(self):
+        return self._module is not None or is_installed(self._name)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return '<LazyModule %s>' % self._name
+
+
+etree = LazyModule('lxml.etree')
+objectify = LazyModule('lxml.objectify')
+yaml = LazyModule('yaml')
+csv = LazyModule('csv')
+ahocorasick = LazyModule('ahocorasick')
+
+
+def HTMLParser(*args, **kwargs):
+    return etree.HTMLParser(*args, **kwargs)
+
+
+def XMLParser(*args, **kwargs):
+    return etree.XMLParser(*args, **kwargs)
+
+
+def get_yaml_loader():
+    """
+    Safe YAML loader, C-based one from LibYAML when PyYAML is built with it.
+    """
+    return getattr(yaml, 'CSafeLoader', None) or yaml.SafeLoader
 
-    HTMLParser = etree.HTMLParser
-    XMLParser = etree.XMLParser
-except ImportError:
-    etree = None
-    objectify = None
-    HTMLParser = None
-    XMLParser = None
 
 try:
-    import ujson as json
+    from collections.abc import Sequence
 except ImportError:
-    import json
-
+    from collections import Sequence
 
 try:
     string_types = (str, unicode)
 except NameError:
     string_types = (str, )
+
+try:
+    from os import cpu_count
+except ImportError:  # Python 2
+    from multiprocessing import cpu_count as _cpu_count
+
+    def cpu_count():
+        try:
+            return _cpu_count()
+        except NotImplementedError:
+            return None
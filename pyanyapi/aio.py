@@ -0,0 +1,62 @@
+# coding: utf-8
+"""
+asyncio integration. Content is parsed in executor, so event loop is not blocked by CPU-heavy work.
+"""
+import asyncio
+from collections import deque
+
+from .batch import parse_all_content, preload_content
+
+
+async def run_in_executor(func, parser, content, executor=None, timeout=None):
+    """
+    Runs `func(parser, content)` in executor. On timeout or cancellation the awaiting side is cancelled,
+    already running task is not interrupted, but its result is discarded.
+    """
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        executor = parser.executor
+    return await asyncio.wait_for(loop.run_in_executor(executor, func, parser, content), timeout)
+
+
+async def aparse(parser, content='', executor=None, timeout=None):
+    return await run_in_executor(preload_content, parser, content, executor, timeout)
+
+
+async def aparse_all(parser, content='', executor=None, timeout=None):
+    return await run_in_executor(parse_all_content, parser, content, executor, timeout)
+
+
+async def aiterate(iterable):
+    if hasattr(iterable, '__aiter__'):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
+
+
+async def amap_parser(func, parser, iterable, executor=None, timeout=None, concurrency=4):
+    """
+    Applies `func(parser, content)` to every item of (async) iterable and yields results in order.
+    At most `concurrency` items are processed at any moment, next items are not consumed until then.
+    """
+    pending = deque()
+    try:
+        async for content in aiterate(iterable):
+            pending.append(asyncio.ensure_future(run_in_executor(func, parser, content, executor, timeout)))
+            if len(pending) >= concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def aparse_many(parser, iterable, executor=None, timeout=None, concurrency=4):
+    return amap_parser(preload_content, parser, iterable, executor, timeout, concurrency)
+
+
+def aparse_all_many(parser, iterable, executor=None, timeout=None, concurrency=4):
+    return amap_parser(parse_all_content, parser, iterable, executor, timeout, concurrency)
@@ -0,0 +1,87 @@
+# coding: utf-8
+"""
+Aho-Corasick automaton to find many substrings in a single scan of content.
+C implementation from `pyahocorasick` package is used when it is installed.
+"""
+from collections import deque
+
+from ._compat import ahocorasick
+
+
+# Number of needles, starting from which one automaton scan is faster than a substring search per needle
+THRESHOLD = 20 if ahocorasick else 150
+
+
+class Automaton(object):
+    """
+    Finds which of the given needles occur in text. Scanning stops when all needles are found.
+    """
+
+    def __init__(self, needles):
+        self.needles = frozenset(needles)
+        # Empty string is a substring of any text
+        self.nonempty = frozenset(needle for needle in self.needles if needle)
+        if ahocorasick and self.nonempty:
+            self.automaton = ahocorasick.Automaton()
+            for needle in self.nonempty:
+                self.automaton.add_word(needle, needle)
+            self.automaton.make_automaton()
+        else:
+            self.automaton = None
+            self.build()
+
+    def build(self):
+        """
+        Builds trie of needles and failure links between its nodes.
+        Every node is a number, `outputs` holds needles, which end in the node.
+        """
+        self.transitions = [{}]
+        self.outputs = [()]
+        for needle in self.nonempty:
+            node = 0
+            for char in needle:
+                following = self.transitions[node].get(char)
+                if following is None:
+                    following = self.transitions[node][char] = len(self.transitions)
+                    self.transitions.append({})
+                    self.outputs.append(())
+                node = following
+            self.outputs[node] += (needle, )
+        self.failures = [0] * len(self.transitions)
+        queue = deque(self.transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, following in self.transitions[node].items():
+                queue.append(following)
+                failure = self.failures[node]
+                while failure and char not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                failure = self.transitions[failure].get(char, 0)
+                self.failures[following] = failure if failure != following else 0
+                self.outputs[following] += self.outputs[self.failures[following]]
+
+    def search(self, text):
+        """
+        Returns set of needles, found in text.
+        """
+        found = set(self.needles - self.nonempty)
+        if not self.nonempty:
+            return found
+        total = len(self.needles)
+        if self.automaton is not None:
+            for _, needle in self.automaton.iter(text):
+                found.add(needle)
+                if len(found) == total:
+                    break
+            return found
+        transitions, failures, outputs = self.transitions, self.failures, self.outputs
+        node = 0
+        for char in text:
+            while node and char not in transitions[node]:
+                node = failures[node]
+            node = transitions[node].get(char, 0)
+            if outputs[node]:
+                found.update(outputs[node])
+                if len(found) == total:
+                    break
+        return found
@@ -0,0 +1,112 @@
+# coding: utf-8
+"""
+Processing of many documents with a single parser.
+Results are streamed in order, while only a fixed number of tasks is in flight.
+"""
+from collections import deque
+from functools import partial
+from itertools import islice
+
+from ._compat import cpu_count, string_types
+
+
+# Parser, installed into process pool workers by `init_worker`
+_worker_parser = None
+
+
+def parse_content(parser, content):
+    return parser.parse(content)
+
+
+def preload_content(parser, content):
+    """
+    Parses content in the current thread, only attributes evaluation is left to the consumer.
+    """
+    return parser.parse(content).preload()
+
+
+def parse_all_content(parser, content):
+    return parser.parse_all(content)
+
+
+def parse_only_content(keys, parser, content):
+    return parser.parse_only(content, keys)
+
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_chunk(func, parser, chunk):
+    return [func(parser, content) for content in chunk]
+
+
+def init_worker(parser):
+    global _worker_parser
+    _worker_parser = parser
+
+
+def process_worker_chunk(func, chunk):
+    return process_chunk(func, _worker_parser, chunk)
+
+
+def is_process_pool(executor):
+    if executor == 'process':
+        return True
+    from concurrent.futures import ProcessPoolExecutor
+
+    return isinstance(executor, ProcessPoolExecutor)
+
+
+def get_pool(executor, workers, parser, func):
+    """
+    Returns executor, flag if it should be shut down after processing and task to submit chunks to.
+    """
+    if executor == 'thread':
+        from concurrent.futures import ThreadPoolExecutor
+
+        return ThreadPoolExecutor(workers), True, partial(process_chunk, func, parser)
+    if executor == 'process':
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Parser is transferred once per worker, not once per task
+        pool = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(parser, ))
+        return pool, True, partial(process_worker_chunk, func)
+    if isinstance(executor, string_types):
+        raise ValueError('Unknown executor: %s' % executor)
+    return executor, False, partial(process_chunk, func, parser)
+
+
+def map_parser(parser, func, iterable, executor=None, workers=None, chunksize=1):
+    """
+    Applies `func(parser, content)` to every item of iterable and yields results in order.
+    `executor` could be None (serial processing), 'thread', 'process' or any `concurrent.futures.Executor`.
+    At most `2 * workers` chunks of `chunksize` items are in flight at any moment.
+    """
+    if executor is None:
+        for content in iterable:
+            yield func(parser, content)
+        return
+    workers = workers or cpu_count() or 1
+    pool, owned, task = get_pool(executor, workers, parser, func)
+    max_pending = 2 * workers
+    pending = deque()
+    try:
+        for chunk in iter_chunks(iterable, chunksize):
+            pending.append(pool.submit(task, chunk))
+            if len(pending) >= max_pending:
+                for result in pending.popleft().result():
+                    yield result
+        while pending:
+            for result in pending.popleft().result():
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            pool.shutdown(wait=True)
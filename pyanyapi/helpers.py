@@ -3,6 +3,10 @@
 Functions to dynamically attach attributes to classes.
 Most of parsing results are cached because of immutability of input data.
 """
+from collections import OrderedDict
+from operator import itemgetter
+
+from ._compat import Sequence, string_types
 
 
 class cached_property(object):
@@ -17,17 +21,315 @@ class cached_property(object):
         return res
 
 
-def memoize(f):
-    memo = {}
+class CacheStats(object):
+    """
+    Counters of cache usage.
+    """
+    __slots__ = ('hits', 'misses', 'evictions')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def add(self, counter):
+        setattr(self, counter, getattr(self, counter) + 1)
+
+    def __repr__(self):
+        return '<CacheStats hits=%s misses=%s evictions=%s>' % (self.hits, self.misses, self.evictions)
+
+
+class LRUCache(object):
+    """
+    Mapping with limited size, least recently used items are evicted first.
+    `maxsize` None means unlimited size, 0 disables caching. Usage is counted in own `stats`
+    and, optionally, in shared `totals`.
+    """
+    __slots__ = ('maxsize', 'data', 'stats', 'totals')
+
+    def __init__(self, maxsize=None, totals=None):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.stats = CacheStats()
+        self.totals = totals
+
+    def count(self, counter):
+        self.stats.add(counter)
+        if self.totals is not None:
+            self.totals.add(counter)
+
+    def get(self, key, default=None):
+        try:
+            value = self.data.pop(key)
+        except KeyError:
+            self.count('misses')
+            return default
+        self.data[key] = value
+        self.count('hits')
+        return value
+
+    def __setitem__(self, key, value):
+        if self.maxsize == 0:
+            return
+        self.data.pop(key, None)
+        self.data[key] = value
+        if self.maxsize is not None and len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.count('evictions')
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def clear(self):
+        self.data.clear()
+
+
+class LazySequence(Sequence):
+    """
+    Sequence, which items are built from items of `source` with `factory` on first access and cached.
+    """
+
+    def __init__(self, source, factory):
+        self.source = source
+        self.factory = factory
+        self._items = {}
+
+    def __len__(self):
+        return len(self.source)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Sequence index out of range')
+        try:
+            return self._items[index]
+        except KeyError:
+            item = self._items[index] = self.factory(self.source[index])
+            return item
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, LazySequence)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<LazySequence of %s items, %s built>' % (len(self), len(self._items))
+
+
+class Record(tuple):
+    """
+    Compact immutable result with fixed fields. Values are available as attributes, by positions and by names.
+    Classes for every set of fields are created by `get_record_class`.
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, string_types):
+            try:
+                key = self._fields.index(key)
+            except ValueError:
+                raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+    def _asdict(self):
+        return dict(zip(self._fields, self))
+
+    def __repr__(self):
+        return 'Record(%s)' % ', '.join('%s=%r' % item for item in zip(self._fields, self))
+
+    def __reduce__(self):
+        return make_record, (self._fields, tuple(self))
+
+
+_record_classes = {}
+
+
+def get_record_class(fields):
+    """
+    Record class with given fields. Classes are shared between all records with the same fields.
+    """
+    fields = tuple(fields)
+    try:
+        return _record_classes[fields]
+    except KeyError:
+        namespace = {'__slots__': (), '_fields': fields}
+        for position, name in enumerate(fields):
+            namespace.setdefault(name, property(itemgetter(position)))
+        record_class = _record_classes[fields] = type('Record', (Record, ), namespace)
+        return record_class
+
+
+def make_record(fields, values):
+    return tuple.__new__(get_record_class(fields), values)
+
+
+def memoize(f, maxsize=None, totals=None):
+    """
+    Caches results of single argument function in LRU cache, which is available as `cache` attribute.
+    """
+    cache = LRUCache(maxsize, totals)
+    missing = object()
 
     def inner(key):
-        if key not in memo:
-            memo[key] = f(key)
-        return memo[key]
+        value = cache.get(key, missing)
+        if value is missing:
+            value = cache[key] = f(key)
+        return value
 
+    inner.cache = cache
+    inner.__wrapped__ = f
     return inner
 
 
+def lookup(target, query, empty_result=None):
+    """
+    Walks through nested dictionaries & lists with compiled query - sequence of (key, index) pairs.
+    Falsy values are returned as is.
+    """
+    if not target:
+        return target
+    for key, index in query:
+        if target:
+            if isinstance(target, dict):
+                target = target.get(key, empty_result)
+            elif index is None:
+                return empty_result
+            else:
+                try:
+                    target = target[index]
+                except (IndexError, TypeError):
+                    return empty_result
+        else:
+            return target
+    return target
+
+
+class FanOutQuery(tuple):
+    """
+    Compiled dictionary query with wildcard or slice steps. Its result is a flat list of all matched values.
+    """
+    __slots__ = ()
+
+    def __hash__(self):
+        # Slices are not hashable, but steps are fully defined by their keys
+        return hash(tuple(key for key, _ in self))
+
+
+def lookup_all(target, query):
+    """
+    Walks through nested dictionaries & lists with compiled query and collects all matched values in document order.
+    Steps with `slice` index fan out - over matched items of lists or, for `*`, over values of dictionaries.
+    Missing keys & indexes are skipped, falsy values are kept.
+    """
+    targets = [target]
+    for key, index in query:
+        matched = []
+        if isinstance(index, slice):
+            for item in targets:
+                if isinstance(item, (list, tuple)):
+                    matched.extend(item[index])
+                elif isinstance(item, dict):
+                    if key == '*':
+                        matched.extend(item.values())
+                    elif key in item:
+                        matched.append(item[key])
+        else:
+            for item in targets:
+                if isinstance(item, dict):
+                    if key in item:
+                        matched.append(item[key])
+                elif index is not None and isinstance(item, (list, tuple)):
+                    try:
+                        matched.append(item[index])
+                    except IndexError:
+                        pass
+        if not matched:
+            return matched
+        targets = matched
+    return targets
+
+
+class QueryTrie(object):
+    """
+    Compiled dictionary queries, merged by their common prefixes. Resolves all of them with a single traversal
+    of the target - every shared step is done once. Results are the same as of separate `lookup` calls.
+    """
+    __slots__ = ('names', 'all_names', 'children')
+
+    def __init__(self, queries=None):
+        # Names of queries, which end at this node
+        self.names = []
+        # Names of queries, which pass through this node
+        self.all_names = []
+        # (key, index, node) triples
+        self.children = []
+        for name, query in (queries or {}).items():
+            self.add(name, query)
+
+    def add(self, name, query):
+        node = self
+        node.all_names.append(name)
+        for key, index in query:
+            for child_key, child_index, child in node.children:
+                if child_key == key and child_index == index:
+                    node = child
+                    break
+            else:
+                child = QueryTrie()
+                node.children.append((key, index, child))
+                node = child
+            node.all_names.append(name)
+        node.names.append(name)
+
+    def resolve(self, target, empty_result=None, results=None):
+        """
+        Returns mapping of all queries names to their results.
+        """
+        if results is None:
+            results = {}
+        for name in self.names:
+            results[name] = target
+        if not self.children:
+            return results
+        if not target:
+            # Falsy values are returned as is
+            for _, _, child in self.children:
+                for name in child.all_names:
+                    results[name] = target
+        elif isinstance(target, dict):
+            for key, _, child in self.children:
+                child.resolve(target.get(key, empty_result), empty_result, results)
+        else:
+            for _, index, child in self.children:
+                if index is not None:
+                    try:
+                        value = target[index]
+                    except (IndexError, TypeError):
+                        pass
+                    else:
+                        child.resolve(value, empty_result, results)
+                        continue
+                for name in child.all_names:
+                    results[name] = empty_result
+        return results
+
+
 def attach_attribute(target, name, attr):
     attr.__name__ = name
     attr._attached = True
@@ -35,5 +337,7 @@ def attach_attribute(target, name, attr):
 
 
 def attach_cached_property(target, name, prop):
+    # Value is cached in instance under the function name
+    prop.__name__ = name
     method = cached_property(prop)
     attach_attribute(target, name, method)
@@ -0,0 +1,122 @@
+# coding: utf-8
+"""
+Optional timing of parsing phases. Sink is any callable, accepting event name, name of parser or attribute
+and duration in seconds (None for cache events):
+
+    def sink(event, name, duration):
+        ...
+
+Events are 'prepare_content', 'perform_parsing', 'attribute', 'expand_results',
+'cache_hit', 'cache_miss' and 'cache_eviction'. Without sink parsers are not wrapped at all.
+"""
+import math
+from collections import defaultdict
+from timeit import default_timer
+
+from .helpers import CacheStats
+
+
+CACHE_EVENTS = {'hits': 'cache_hit', 'misses': 'cache_miss', 'evictions': 'cache_eviction'}
+
+
+def timed(func, sink, event, name):
+    """
+    Reports duration of every `func` call to sink.
+    """
+
+    def inner(*args, **kwargs):
+        start = default_timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sink(event, name, default_timer() - start)
+
+    return inner
+
+
+class InstrumentedCacheStats(CacheStats):
+    """
+    Reports cache usage to sink along with counting.
+    """
+
+    def __init__(self, sink, name):
+        self.sink = sink
+        self.name = name
+        super(InstrumentedCacheStats, self).__init__()
+
+    def add(self, counter):
+        super(InstrumentedCacheStats, self).add(counter)
+        self.sink(CACHE_EVENTS[counter], self.name, None)
+
+
+def instrument_class(cls, sink, name):
+    """
+    Wraps parsing phases of generated interface class. Attributes are wrapped by parser.
+    """
+    cls.perform_parsing = timed(cls.perform_parsing, sink, 'perform_parsing', name)
+    cls.expand_results = staticmethod(timed(cls.expand_results, sink, 'expand_results', name))
+    cls.cache_stats = InstrumentedCacheStats(sink, name)
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    return values[max(int(math.ceil(fraction * len(values))) - 1, 0)]
+
+
+class Aggregator(object):
+    """
+    In-memory sink. Keeps all durations to calculate percentiles.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.counters = defaultdict(int)
+
+    def __call__(self, event, name, duration):
+        if duration is None:
+            self.counters[(event, name)] += 1
+        else:
+            self.durations[(event, name)].append(duration)
+
+    def summary(self):
+        """
+        Statistics of durations by (event, name) pairs.
+        """
+        result = {}
+        for key, durations in list(self.durations.items()):
+            durations = sorted(durations)
+            total = sum(durations)
+            result[key] = {
+                'count': len(durations),
+                'total': total,
+                'mean': total / len(durations),
+                'p50': percentile(durations, 0.5),
+                'p90': percentile(durations, 0.9),
+                'p99': percentile(durations, 0.99),
+                'max': durations[-1],
+            }
+        return result
+
+    def reset(self):
+        self.durations.clear()
+        self.counters.clear()
+
+
+class LoggingSink(object):
+    """
+    Writes every event to logger.
+    """
+
+    def __init__(self, logger=None, level=None):
+        import logging
+
+        self.logger = logger or logging.getLogger('pyanyapi')
+        self.level = logging.DEBUG if level is None else level
+
+    def __call__(self, event, name, duration):
+        if duration is None:
+            self.logger.log(self.level, '%s %s', event, name)
+        else:
+            self.logger.log(self.level, '%s %s %.6fs', event, name, duration)
@@ -2,23 +2,105 @@
 """
 Classes to be filled with interface declarations.
 """
-import csv
 import re
 import sys
+from copy import deepcopy
+from functools import partial
 
-import yaml
-
-from ._compat import json, etree, objectify, XMLParser, HTMLParser, string_types
+from ._compat import csv, etree, get_yaml_loader, objectify, yaml, XMLParser, HTMLParser, string_types
 from .exceptions import ResponseParseError
-from .helpers import memoize
+from .helpers import (
+    FanOutQuery, LazySequence, LRUCache, QueryTrie, Record, get_record_class, lookup, lookup_all, memoize
+)
+from .jsonbackends import get_backend
+from .jsonstream import resolve_queries
+from .multipattern import first_match
 
 
 DICT_LOOKUP = ' > '
+# Dictionary lookup step, which matches all items of lists and all values of dictionaries
+WILDCARD = '*'
+# Lines with their endings, CSV reader handles quoted line breaks itself
+CSV_LINE = re.compile(r'[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$')
+# Scalars, which could be pickled without documents, they are extracted from
+PLAIN_TYPES = (bool, int, float, bytes) + string_types
+# Location paths, which start from the document root
+ABSOLUTE_PATH = re.compile(r'(?:^|[(\[,|=<>+*-]|\b(?:and|or|div|mod))\s*/')
+# Elements, which HTML parser puts into <head>, when they are parsed on their own
+HEAD_TAGS = ('base', 'link', 'meta', 'script', 'style', 'title')
+# Child, descendant & attribute steps without unions and operators outside of predicates
+DOWNWARD_STEPS = re.compile(r'(?://?@?(?!\.)[\w.*-]+(?::[\w.*-]+)?(?:\(\))?)+$')
+# Path expression without unions and operators outside of predicates, so it could be continued with more steps
+PATH_EXPRESSION = re.compile(r'[\w.*@:/()-]+$')
+
+
+def split_predicates(path):
+    """
+    Path without predicates and predicates themselves, e.g. "/a[@b='[c]']/d" -> ("/a/d", "[@b='[c]']").
+    None if brackets are not balanced.
+    """
+    outside, inside, depth, quote = [], [], 0, None
+    for char in path:
+        if depth:
+            inside.append(char)
+        if quote:
+            if char == quote:
+                quote = None
+        elif depth and char in '"\'':
+            quote = char
+        elif char == '[':
+            if not depth:
+                inside.append(char)
+            depth += 1
+        elif char == ']':
+            depth -= 1
+            if depth < 0:
+                return None
+        elif not depth:
+            outside.append(char)
+    if depth or quote:
+        return None
+    return ''.join(outside), ''.join(inside)
+
+
+def matches_path(pattern, path):
+    parts = split_predicates(path)
+    return parts is not None and pattern.match(parts[0]) is not None
+
+
+def compile_slice(action):
+    """
+    Slice from `start:stop[:step]` step, None if it is not a slice.
+    """
+    parts = action.split(':')
+    if len(parts) not in (2, 3):
+        return None
+    try:
+        bounds = [int(part) if part.strip() else None for part in parts]
+    except ValueError:
+        return None
+    if len(bounds) == 3 and bounds[2] == 0:
+        return None
+    return slice(*bounds)
+
+
+def compile_lookup(action):
+    """
+    Dictionary lookup step. Index is used when target turns out to be a list.
+    Wildcard `*` and slices, like `0:100`, have `slice` index - they fan out over all matched items.
+    """
+    if action == WILDCARD:
+        return action, slice(None)
+    try:
+        index = int(action)
+    except ValueError:
+        index = compile_slice(action)
+    return action, index
 
 
 def expand_results(value):
-    if isinstance(value, list):
-        return [item.parse_all() for item in value]
+    if isinstance(value, (list, LazySequence)):
+        return [item.parse_all() if isinstance(item, BaseInterface) else item for item in value]
     return value
 
 
@@ -28,11 +110,45 @@ class BaseInterface(object):
     """
     content = None
     empty_result = None
+    # Settings, compiled by parser, by attribute names
+    compiled_settings = {}
+    # Maximal number of cached queries results, None - unlimited, 0 - no caching
+    cache_size = None
+    # Usage counters of all caches of the interface class
+    cache_stats = None
+    # Names of properties, evaluated by `parse_all`. Collected once, when parser generates the class
+    property_names = None
+    # `parse_all` returns compact records and releases content and intermediate state of interface
+    compact = False
+    # Parser, which generated the class. Interfaces are re-created with it on unpickling
+    _parser = None
+    expand_results = staticmethod(expand_results)
 
     def __init__(self, content, strip=False):
         self.content = content
         self.strip = strip
-        self.parse = memoize(self.parse)
+        self.parse = memoize(self.parse, self.cache_size, self.cache_stats)
+
+    @classmethod
+    def compile_settings(cls, settings, **options):
+        """
+        Converts settings into ready-to-run objects. It is done once, when parser is built,
+        so malformed queries fail early.
+        """
+        if isinstance(settings, dict):
+            compiled = dict(settings)
+            for key in ('base', 'children'):
+                if key in compiled:
+                    compiled[key] = cls.compile_query(compiled[key], **options)
+            return compiled
+        return cls.compile_query(settings, **options)
+
+    @classmethod
+    def compile_query(cls, query, **options):
+        """
+        Converts single query into ready-to-run object. Already compiled queries are returned as is.
+        """
+        return query
 
     @classmethod
     def init_attr(cls, settings):
@@ -54,33 +170,148 @@ class BaseInterface(object):
     def perform_parsing(self):
         raise NotImplementedError
 
+    def preload(self):
+        """
+        Parses content ahead of time. Parsing errors will be raised on attributes access.
+        """
+        try:
+            self.parsed_content
+        except (NotImplementedError, ResponseParseError):
+            pass
+        return self
+
     def parse(self, query):
         raise NotImplementedError
 
+    @classmethod
+    def collect_property_names(cls):
+        return tuple(
+            key for key, attr in cls.__dict__.items()
+            if hasattr(attr, '_attached') and type(attr).__name__ == 'cached_property'
+        )
+
+    def iter_all(self):
+        """
+        Lazily processes all available properties and yields (name, result) pairs as they are computed.
+        """
+        names = self.property_names
+        if names is None:
+            names = self.collect_property_names()
+        for key in names:
+            yield key, self.expand_results(getattr(self, key, self.empty_result))
+
+    def parse_only(self, keys):
+        """
+        Processes only given properties. Properties, they depend on, are evaluated on demand.
+        """
+        return dict((key, self.expand_results(getattr(self, key, self.empty_result))) for key in keys)
+
     def parse_all(self):
         """
-        Processes all available properties and returns results as dictionary.
+        Processes all available properties and returns results as dictionary or, in compact mode, as record.
         """
-        return dict(
-            (key, expand_results(getattr(self, key, self.empty_result)))
-            for key, attr in self.__class__.__dict__.items()
-            if hasattr(attr, '_attached') and type(attr).__name__ == 'cached_property'
-        )
+        result = dict(self.iter_all())
+        if self.compact:
+            self.release()
+            return get_record_class(result)(result.values())
+        return result
+
+    def release(self):
+        """
+        Drops content, parsed content and queries cache. Only already computed attributes are available after it.
+        """
+        self.content = None
+        for name in ('_parsed_content', 'parse'):
+            self.__dict__.pop(name, None)
 
     def maybe_strip(self, value):
         if self.strip and isinstance(value, string_types):
             return value.strip()
         return value
 
+    def __reduce__(self):
+        """
+        Interfaces are pickled as their parser, content and computed attributes with plain values. Content is parsed
+        again on demand and other attributes, e.g. elements or sub-parsers results, are computed from it again.
+        Interfaces over already parsed content, e.g. from `XMLParser.iterparse` or sub-parsers, also keep parsed
+        content, if it could be converted to plain value.
+        """
+        if self._parser is None:
+            raise TypeError('Only interfaces, generated by parsers, can be pickled')
+        names = self.property_names or ()
+        state = dict(
+            (name, value) for name, value in self.__dict__.items() if name in names and is_plain(value)
+        )
+        args = (self._parser, self.content, self.strip, state)
+        if self.content is None and '_parsed_content' in self.__dict__:
+            dumped = self.dump_parsed_content(self._parsed_content)
+            if dumped is not EMPTY_RESULT:
+                args += (dumped, )
+        return restore_interface, args
+
+    @classmethod
+    def dump_parsed_content(cls, parsed_content):
+        """
+        Plain value, which parsed content could be restored from, or `EMPTY_RESULT`.
+        """
+        return parsed_content if is_plain(parsed_content) else EMPTY_RESULT
+
+    @classmethod
+    def load_parsed_content(cls, value):
+        return value
+
+
+def is_plain(value):
+    """
+    Value consists of built-in scalars and containers only.
+    """
+    if value is None or isinstance(value, PLAIN_TYPES):
+        return True
+    if type(value) in (list, tuple) or isinstance(value, Record):
+        return all(is_plain(item) for item in value)
+    if type(value) is dict:
+        return all(is_plain(key) and is_plain(item) for key, item in value.items())
+    return False
+
 
 # Uses as fallback. None - can be obtained from JSON's null, any string also can be, so unique object is a best choice
 EMPTY_RESULT = object()
 
 
+def restore_interface(parser, content, strip, state, parsed_content=EMPTY_RESULT):
+    interface = parser.create_interface(content)
+    interface.strip = strip
+    interface.__dict__.update(state)
+    if parsed_content is not EMPTY_RESULT:
+        interface._parsed_content = interface.load_parsed_content(parsed_content)
+    return interface
+
+
+def build_attributes_index(parsers):
+    """
+    Maps attribute names to parsers, which provide them, in order of parsers declaration.
+    """
+    index = {}
+    for parser in parsers:
+        for name in parser.attributes:
+            providers = index.setdefault(name, [])
+            if parser not in providers:
+                providers.append(parser)
+    return index
+
+
 class CombinedInterface(BaseInterface):
+    """
+    Routes attributes to interfaces of combined parsers. Every parser handles content at most once.
+    """
 
     def __init__(self, parsers, *args, **kwargs):
         self.parsers = parsers
+        attributes_index = kwargs.pop('attributes_index', None)
+        if attributes_index is None:
+            attributes_index = build_attributes_index(parsers)
+        self.attributes_index = attributes_index
+        self._interfaces = {}
         super(CombinedInterface, self).__init__(*args, **kwargs)
 
     def __getattribute__(self, item):
@@ -90,15 +321,26 @@ class CombinedInterface(BaseInterface):
         except AttributeError:
             return self.walk(item)
 
-    def walk(self, item):
+    def get_interface(self, parser):
         """
-        Recursively walks through all available parsers.
+        Interface of the given parser over current content. Created once per parser.
         """
+        if parser not in self._interfaces:
+            self._interfaces[parser] = parser.parse(self.content)
+        return self._interfaces[parser]
+
+    def preload(self):
         for parser in self.parsers:
+            self.get_interface(parser).preload()
+        return self
+
+    def walk(self, item):
+        """
+        Recursively walks through all parsers, which provide given attribute.
+        """
+        for parser in self.attributes_index.get(item, ()):
             try:
-                if item not in parser.attributes:
-                    continue
-                result = getattr(parser.parse(self.content), item, EMPTY_RESULT)
+                result = getattr(self.get_interface(parser), item, EMPTY_RESULT)
                 # Ignore empty results in current parser
                 if result in (EMPTY_RESULT, parser.interface_class.empty_result):
                     continue
@@ -106,11 +348,77 @@ class CombinedInterface(BaseInterface):
             except (AttributeError, ResponseParseError):
                 pass
 
-    def parse_all(self):
-        result = super(CombinedInterface, self).parse_all()
+    def release(self):
+        super(CombinedInterface, self).release()
+        for interface in self._interfaces.values():
+            interface.release()
+
+    def iter_all(self):
+        for item in super(CombinedInterface, self).iter_all():
+            yield item
         for parser in self.parsers:
-            result.update(parser.parse_all(self.content))
-        return result
+            for item in self.get_interface(parser).iter_all():
+                yield item
+
+
+class XPathQuery(object):
+    """
+    Compiled XPath expression. Absolute expressions are evaluated against subtree views
+    (`etree.ElementTree(element)`) as if the element would be the document root.
+    """
+
+    # Query, which result this query continues with `suffix` steps
+    prefix = None
+    suffix = None
+    # Result is used by several settings and is evaluated once per document
+    shared = False
+
+    def __init__(self, path):
+        self.path = path
+        self.compiled = etree.XPath(path)
+        self.absolute = ABSOLUTE_PATH.search(path) is not None
+
+    def __call__(self, context, evaluator=None):
+        """
+        `evaluator` - `etree.XPathDocumentEvaluator` over the subtree view, to avoid its creation on every call.
+        """
+        if self.absolute and isinstance(context, etree._ElementTree):
+            if evaluator is not None:
+                return evaluator(self.path)
+            return context.xpath(self.path)
+        return self.compiled(context)
+
+    def set_prefix(self, prefix):
+        """
+        Continues `prefix` query, if the rest of the path could be evaluated from its result.
+        """
+        rest = self.path[len(prefix.path):]
+        if (
+            # Predicates right after the prefix would filter the whole node set instead of the last step
+            not self.path.startswith(prefix.path) or not rest.startswith('/') or
+            not matches_path(DOWNWARD_STEPS, rest) or
+            not matches_path(PATH_EXPRESSION, prefix.path) or
+            # Other axes and absolute paths in predicates could leave subtree views
+            '::' in rest or ABSOLUTE_PATH.search(split_predicates(rest)[1]) is not None
+        ):
+            return False
+        self.prefix, self.suffix = prefix, etree.XPath('$nodes' + rest)
+        prefix.shared = True
+        return True
+
+    def continue_from(self, nodes):
+        """
+        Evaluates the rest of the path from node set, as XPath would do it with the whole path.
+        None if prefix result is not a node set of elements.
+        """
+        if not isinstance(nodes, list):
+            return None
+        if not nodes:
+            return []
+        try:
+            return self.suffix(nodes[0], nodes=nodes)
+        except (etree.XPathResultError, TypeError):
+            return None
 
 
 class XPathInterface(BaseInterface):
@@ -131,7 +439,9 @@ class XPathInterface(BaseInterface):
     'children' key usually uses for modification of result of 'base' expression
     before concatenation.
     """
-    parser_class = HTMLParser
+    parser_class = staticmethod(HTMLParser)
+    # Used to pickle parsed content
+    serialization_method = 'html'
     empty_result = ''
     _error_message = 'HTML data can not be parsed.'
 
@@ -146,25 +456,140 @@ class XPathInterface(BaseInterface):
             result = self.parse(settings['base'])
             child_query = settings.get('children')
             if child_query:
-                return [self.maybe_strip(''.join(element.xpath(child_query))) for element in result]
+                return [self.maybe_strip(''.join(child_query(element))) for element in result]
             sub_parser = settings.get('parser')
             if sub_parser:
-                return [
-                    (sub_parser() if callable(sub_parser) else sub_parser).parse(etree.tostring(element))
-                    for element in result
-                ]
+                if callable(sub_parser):
+                    sub_parser = sub_parser()
+                # Elements are parsed only when they are accessed
+                return LazySequence(result, partial(self.parse_element, sub_parser))
             return result
 
         return self.parse(settings)
 
+    @staticmethod
+    def parse_element(sub_parser, element):
+        """
+        XPath-based sub-parsers work on a standalone copy of the element, without serializing and parsing it again.
+        The copy has the same structure, as the serialized element would have after parsing.
+        """
+        interface_class = sub_parser.interface_class
+        if issubclass(interface_class, XPathInterface) and isinstance(element, etree._Element):
+            return sub_parser.from_parsed(interface_class.detach_element(element))
+        return sub_parser.parse(etree.tostring(element))
+
+    @staticmethod
+    def detach_element(element):
+        """
+        Copy of the element in its own document. Like HTML parser does with a fragment, it is wrapped
+        into <html> and <body> or <head> elements.
+        """
+        copy = deepcopy(element)
+        if copy.tag == 'html':
+            copy.tail = None
+            return copy
+        root = etree.Element('html')
+        if copy.tag in ('head', 'body'):
+            copy.tail = None
+            root.append(copy)
+        else:
+            etree.SubElement(root, 'head' if copy.tag in HEAD_TAGS else 'body').append(copy)
+        return root
+
+    @classmethod
+    def dump_parsed_content(cls, parsed_content):
+        if isinstance(parsed_content, etree._Element):
+            return etree.tostring(parsed_content, method=cls.serialization_method)
+        return super(XPathInterface, cls).dump_parsed_content(parsed_content)
+
+    @classmethod
+    def load_parsed_content(cls, value):
+        if isinstance(value, bytes):
+            return etree.fromstring(value, cls.parser_class())
+        return value
+
+    @classmethod
+    def compile_query(cls, query, **options):
+        if isinstance(query, string_types):
+            return XPathQuery(query)
+        return query
+
+    @classmethod
+    def share_queries(cls):
+        """
+        Finds settings with the same expressions, including `base` of dict-based ones, and expressions, which
+        continue other ones. The latter are evaluated from results of the former and all shared results are
+        evaluated once per document.
+        """
+        groups = {}
+        for settings in cls.compiled_settings.values():
+            query = settings.get('base') if isinstance(settings, dict) else settings
+            if isinstance(query, XPathQuery):
+                groups.setdefault(query.path, []).append(query)
+        # The longest prefix is the closest to the query
+        paths = sorted(groups, key=len, reverse=True)
+        for path, group in groups.items():
+            for prefix_path in paths:
+                if prefix_path != path and group[0].set_prefix(groups[prefix_path][0]):
+                    for query in group[1:]:
+                        query.prefix, query.suffix = group[0].prefix, group[0].suffix
+                    break
+        for group in groups.values():
+            shared = len(group) > 1 or group[0].shared
+            for query in group:
+                query.shared = shared
+
+    @property
+    def evaluator(self):
+        """
+        Evaluator of absolute expressions, when parsed content is a subtree view.
+        """
+        if not hasattr(self, '_evaluator'):
+            content = self.parsed_content
+            self._evaluator = etree.XPathDocumentEvaluator(content) if isinstance(content, etree._ElementTree) else None
+        return self._evaluator
+
+    def release(self):
+        super(XPathInterface, self).release()
+        self.__dict__.pop('_evaluator', None)
+        self.__dict__.pop('_shared_results', None)
+
+    def evaluate(self, query):
+        """
+        Result of compiled query. Results of shared queries are kept until release.
+        """
+        if not query.shared:
+            return self.evaluate_query(query)
+        results = self.__dict__.setdefault('_shared_results', {})
+        if query.path not in results:
+            results[query.path] = self.evaluate_query(query)
+        return results[query.path]
+
+    def evaluate_query(self, query):
+        if query.prefix is not None:
+            result = query.continue_from(self.evaluate(query.prefix))
+            if result is not None:
+                return result
+        return query(self.parsed_content, self.evaluator)
+
     def parse(self, query):
-        return self.maybe_strip(self.parsed_content.xpath(query))
+        query = self.compile_query(query)
+        if isinstance(query, XPathQuery):
+            return self.maybe_strip(self.evaluate(query))
+        return self.maybe_strip(query(self.parsed_content))
 
 
 class XMLInterface(XPathInterface):
-    parser_class = XMLParser
+    parser_class = staticmethod(XMLParser)
+    serialization_method = 'xml'
     _error_message = 'XML data can not be parsed.'
 
+    @staticmethod
+    def detach_element(element):
+        copy = deepcopy(element)
+        copy.tail = None
+        return copy
+
 
 class XMLObjectifyInterface(BaseInterface):
     """
@@ -223,25 +648,47 @@ class DictInterface(BaseInterface):
     }
 
     which will get "123" from {"container":{"id":"123"}}
+
+    Wildcard and slice steps return flat list of all matched values:
+
+    {
+        'ids': 'items > * > id',
+        'tags': 'items > 0:100 > tags > *'
+    }
     """
+    # Trie of settings queries, which resolves all of them in `parse_all` with a single traversal
+    trie = None
+
+    @classmethod
+    def compile_query(cls, query, **options):
+        if isinstance(query, string_types):
+            steps = tuple(compile_lookup(action.strip()) for action in query.split(DICT_LOOKUP))
+            if any(isinstance(index, slice) for _, index in steps):
+                return FanOutQuery(steps)
+            return steps
+        return query
+
+    @classmethod
+    def build_trie(cls, names):
+        """
+        Trie of given settings with plain lookup queries. None if there are no such settings.
+        """
+        queries = {}
+        for name in names:
+            compiled = cls.compiled_settings[name]
+            if type(compiled) is tuple and all(isinstance(step, tuple) for step in compiled):
+                queries[name] = compiled
+        return QueryTrie(queries) if queries else None
+
+    def maybe_strip_all(self, values):
+        if self.strip:
+            return [self.maybe_strip(value) for value in values]
+        return values
 
     def get_from_dict(self, target, query):
-        if not target:
-            return target
-        action_list = query.split(DICT_LOOKUP)
-        for action in action_list:
-            if target:
-                action = action.strip()
-                if isinstance(target, dict):
-                    target = target.get(action, self.empty_result)
-                else:
-                    try:
-                        target = target[int(action)]
-                    except (IndexError, TypeError, ValueError):
-                        return self.empty_result
-            else:
-                return target
-        return self.maybe_strip(target)
+        if isinstance(query, FanOutQuery):
+            return self.maybe_strip_all(lookup_all(target, query))
+        return self.maybe_strip(lookup(target, query, self.empty_result))
 
     def execute_method(self, settings):
         if isinstance(settings, dict):
@@ -256,25 +703,75 @@ class DictInterface(BaseInterface):
         return self.parse(settings)
 
     def parse(self, query):
-        return self.get_from_dict(self.parsed_content, query)
+        return self.get_from_dict(self.parsed_content, self.compile_query(query))
+
+    def iter_all(self):
+        if self.trie is not None:
+            results = self.trie.resolve(self.parsed_content, self.empty_result)
+            for name in self.trie.all_names:
+                if name not in self.__dict__:
+                    self.__dict__[name] = self.maybe_strip(results[name])
+        for item in super(DictInterface, self).iter_all():
+            yield item
 
 
 class JSONInterface(DictInterface):
     _error_message = 'JSON data can not be parsed.'
+    # Backend to decode content with, None - the default one
+    json_backend = None
 
     def perform_parsing(self):
         try:
-            return json.loads(self.content)
+            return get_backend(self.json_backend).loads(self.content)
         except (ValueError, TypeError):
             raise ResponseParseError(self._error_message, self.content)
 
 
+class JSONStreamInterface(JSONInterface):
+    """
+    Reads JSON incrementally from text, bytes or file-like object and extracts only values, required by settings.
+    Other subtrees are skipped without building Python objects and reading stops as soon as all values are found.
+    Queries, which are not declared in settings, are not available.
+    """
+    chunk_size = 65536
+
+    @classmethod
+    def build_trie(cls, names):
+        # Stream reader resolves all settings at once itself
+        return None
+
+    @classmethod
+    def get_queries(cls):
+        for settings in cls.compiled_settings.values():
+            yield settings['base'] if isinstance(settings, dict) else settings
+
+    def perform_parsing(self):
+        try:
+            return resolve_queries(
+                self.content, self.get_queries(), get_backend(self.json_backend).loads, self.chunk_size
+            )
+        except (ValueError, TypeError, AttributeError):
+            raise ResponseParseError(self._error_message, self.content)
+
+    def parse(self, query):
+        query = self.compile_query(query)
+        try:
+            value = self.parsed_content[query]
+        except KeyError:
+            raise ValueError('Only queries from settings are available in streaming mode')
+        if isinstance(query, FanOutQuery):
+            return self.maybe_strip_all(value)
+        return self.maybe_strip(value)
+
+
 class YAMLInterface(DictInterface):
     _error_message = 'YAML data can not be parsed.'
+    # Safe loader, None - C-based one from LibYAML when it is available
+    loader = None
 
     def perform_parsing(self):
         try:
-            return yaml.safe_load(self.content)
+            return yaml.load(self.content, Loader=self.loader or get_yaml_loader())
         except yaml.error.YAMLError:
             raise ResponseParseError(self._error_message, self.content)
 
@@ -292,21 +789,39 @@ class AJAXInterface(JSONInterface):
     inner_interface_class = XPathInterface
 
     def __init__(self, *args, **kwargs):
-        self._inner_cache = {}
+        self._inner_cache = LRUCache(self.cache_size, self.cache_stats)
         super(AJAXInterface, self).__init__(*args, **kwargs)
 
-    def get_inner_interface(self, text, json_part):
-        if json_part not in self._inner_cache:
-            inner_content = super(AJAXInterface, self).get_from_dict(text, json_part)
-            self._inner_cache[json_part] = self.inner_interface_class(inner_content, self.strip)
-        return self._inner_cache[json_part]
+    @classmethod
+    def compile_query(cls, query, **options):
+        if isinstance(query, string_types):
+            json_part, xpath_part = query.rsplit(DICT_LOOKUP, 1)
+            return (
+                json_part,
+                super(AJAXInterface, cls).compile_query(json_part),
+                cls.inner_interface_class.compile_query(xpath_part)
+            )
+        return query
+
+    def release(self):
+        super(AJAXInterface, self).release()
+        self._inner_cache.clear()
+
+    def get_inner_interface(self, text, json_part, json_query):
+        interface = self._inner_cache.get(json_part)
+        if interface is None:
+            inner_content = super(AJAXInterface, self).get_from_dict(text, json_query)
+            interface = self._inner_cache[json_part] = self.inner_interface_class(inner_content, self.strip)
+            # Inner interfaces follow cache options of the outer one
+            interface.parse = memoize(interface.parse.__wrapped__, self.cache_size, self.cache_stats)
+        return interface
 
     def get_from_dict(self, target, query):
-        json_part, xpath_part = query.rsplit(DICT_LOOKUP, 1)
-        inner_interface = self.get_inner_interface(target, json_part)
+        json_part, json_query, xpath_query = query
+        inner_interface = self.get_inner_interface(target, json_part, json_query)
         try:
-            return inner_interface.parse(xpath_part)
-        except (etree.XMLSyntaxError, ValueError):
+            return inner_interface.parse(xpath_query)
+        except (etree.XMLSyntaxError, TypeError, ValueError):
             return inner_interface.empty_result
 
 
@@ -323,30 +838,51 @@ class RegExpInterface(BaseInterface):
 
     So, response will be like 'ok' or 'Error 100'.
     """
+    # Scanner, which resolves all settings in `parse_all` at once
+    scanner = None
 
     def __init__(self, content, strip=False, flags=0):
         self.flags = flags
         super(RegExpInterface, self).__init__(content, strip)
 
+    @classmethod
+    def compile_query(cls, query, flags=0, **options):
+        if isinstance(query, string_types + (bytes, )):
+            return re.compile(query, flags)
+        return query
+
     def execute_method(self, settings):
-        matches = re.findall(settings, self.content, self.flags)
-        if matches:
-            return self.maybe_strip(matches[0])
+        match = settings.search(self.content)
+        if match is not None:
+            return self.maybe_strip(first_match(match))
         return self.empty_result
 
     def parse(self, query):
-        return self.execute_method(query)
+        return self.execute_method(self.compile_query(query, flags=self.flags))
+
+    def iter_all(self):
+        if self.scanner is not None:
+            matches = self.scanner.scan(self.content)
+            for name in self.scanner.names:
+                if name not in self.__dict__:
+                    self.__dict__[name] = self.maybe_strip(matches[name]) if name in matches else self.empty_result
+        for item in super(RegExpInterface, self).iter_all():
+            yield item
 
 
 class CSVInterface(BaseInterface):
     """
     Operates with CSV data with simple queries in format 'row_id:column_id'.
+    Columns can be also addressed by names from the first (header) row - 'row_id:column_name'.
 
     {
-        "value": "1:2"
+        "value": "1:2",
+        "price": "1:price"
     }
 
-    Will get 6 from "1,2,3\r\n4,5,6"
+    Will get 6 from "1,2,3\r\n4,5,6" and 10 from "name,price\r\nfoo,10".
+    Rows are read lazily, only up to the last row, required by settings or queries.
+    Content could be a string or a file-like object.
     """
     _error_message = 'CSV data can not be parsed.'
 
@@ -354,21 +890,84 @@ class CSVInterface(BaseInterface):
         self.reader_kwargs = reader_kwargs
         super(CSVInterface, self).__init__(content, strip)
 
+    @classmethod
+    def get_max_row(cls):
+        """
+        The last row, required by settings. None - all rows are required.
+        """
+        rows = [settings[0] for settings in cls.compiled_settings.values()]
+        if any(row < 0 for row in rows):
+            return None
+        return max(rows) if rows else -1
+
+    def iter_lines(self):
+        if isinstance(self.content, string_types):
+            return (match.group() for match in CSV_LINE.finditer(self.content))
+        return iter(self.content)
+
     def perform_parsing(self):
         try:
-            return list(csv.reader(self.content.split(), **self.reader_kwargs))
+            reader = csv.reader(self.iter_lines(), **self.reader_kwargs)
         except (TypeError, AttributeError):
             raise ResponseParseError(self._error_message, self.content)
+        # Empty lines are skipped
+        self._rows = (row for row in reader if row)
+        rows = []
+        self.read_rows(rows, self.get_max_row())
+        return rows
+
+    def read_rows(self, rows, last_row):
+        """
+        Reads rows until `last_row` (None - until the end).
+        """
+        try:
+            while last_row is None or len(rows) <= last_row:
+                rows.append(next(self._rows))
+        except StopIteration:
+            pass
+        except (csv.Error, TypeError, AttributeError):
+            raise ResponseParseError(self._error_message, self.content)
+
+    def release(self):
+        super(CSVInterface, self).release()
+        self.__dict__.pop('_rows', None)
+
+    def get_row(self, row):
+        rows = self.parsed_content
+        self.read_rows(rows, None if row < 0 else row)
+        return rows[row]
+
+    @property
+    def header_index(self):
+        """
+        Positions of columns by their names. The first occurrence wins for duplicated names.
+        """
+        if not hasattr(self, '_header_index'):
+            header = self.get_row(0)
+            self._header_index = dict((name, position) for position, name in reversed(list(enumerate(header))))
+        return self._header_index
+
+    @classmethod
+    def compile_query(cls, query, **options):
+        if isinstance(query, string_types):
+            row, column = query.split(':', 1)
+            if column.strip().lstrip('-').isdigit():
+                column = int(column)
+            return int(row), column
+        return query
 
     def execute_method(self, settings):
-        row, column = settings.split(':')
+        row, column = settings
         try:
-            return self.parsed_content[int(row)][int(column)]
-        except (IndexError, TypeError):
+            values = self.get_row(row)
+            if not isinstance(column, int):
+                column = self.header_index[column]
+            return values[column]
+        except (IndexError, KeyError, TypeError):
             return self.empty_result
 
     def parse(self, query):
-        return self.execute_method(query)
+        return self.execute_method(self.compile_query(query))
 
 
 class IndexOfInterface(BaseInterface):
@@ -382,12 +981,25 @@ class IndexOfInterface(BaseInterface):
     If content contains "bar" string, interface property "has_bar" will be True.
     """
     _error_message = 'Can not perform string search.'
+    # Automaton over all settings, they are looked for in one scan of content
+    automaton = None
 
-    def execute_method(self, settings):
+    @classmethod
+    def compile_query(cls, query, **options):
+        return str(query)
+
+    def perform_parsing(self):
         try:
-            return str(settings) in str(self.content)
+            return str(self.content)
         except (TypeError, ValueError):
             raise ResponseParseError(self._error_message, self.content)
 
+    def execute_method(self, settings):
+        if self.automaton is not None and settings in self.automaton.needles:
+            if not hasattr(self, '_found'):
+                self._found = self.automaton.search(self.parsed_content)
+            return settings in self._found
+        return settings in self.parsed_content
+
     def parse(self, query):
-        return self.execute_method(query)
+        return self.execute_method(self.compile_query(query))
@@ -0,0 +1,122 @@
+# coding: utf-8
+"""
+Registry of JSON decoders, used by JSON-based parsers. Backend could be chosen per parser
+(`backend` argument) or globally (`set_default_backend`). By default the fastest installed one is used.
+"""
+from importlib import import_module
+
+from ._compat import is_installed, string_types
+
+
+class JSONBackend(object):
+    """
+    JSON decoder and types of content, it accepts as is. Other binary content is converted before decoding -
+    memoryview to bytes and bytes to text. Instead of decoder a name of module with `loads` function could be given,
+    it is imported on the first usage.
+    """
+
+    def __init__(self, name, loads=None, input_types=string_types, module=None):
+        self.name = name
+        self.decoder = loads
+        self.input_types = input_types
+        self.module = module
+
+    def loads(self, content):
+        if self.decoder is None:
+            self.decoder = import_module(self.module).loads
+        if not isinstance(content, self.input_types):
+            if isinstance(content, (bytearray, memoryview)) and bytes in self.input_types:
+                content = bytes(content)
+            elif isinstance(content, (bytes, bytearray, memoryview)):
+                content = bytes(content).decode('utf-8')
+        return self.decoder(content)
+
+    def __repr__(self):
+        return '<JSONBackend %s>' % self.name
+
+
+class FallbackBackend(JSONBackend):
+    """
+    Autodetected backend. Content, which it rejects, but the standard `json` module accepts
+    (e.g. NaN & Infinity, which `orjson` doesn't support), is decoded by the latter.
+    """
+
+    def __init__(self, backend, fallback):
+        super(FallbackBackend, self).__init__(backend.name, input_types=backend.input_types)
+        self.backend = backend
+        self.fallback = fallback
+
+    def loads(self, content):
+        try:
+            return self.backend.loads(content)
+        except ValueError:
+            return self.fallback.loads(content)
+
+
+BACKENDS = {}
+# Backends in order of their speed, the first registered one is used by default
+PREFERENCE = ['orjson', 'ujson', 'json']
+_default_backend = None
+# Autodetected backends with fallback to `json`, by their names
+_detected = {}
+
+
+def register_backend(name, loads=None, input_types=string_types, module=None):
+    """
+    Registers decoder (or module with `loads` function) under given name.
+    `input_types` are types of content, which `loads` accepts without conversion.
+    """
+    backend = BACKENDS[name] = JSONBackend(name, loads, input_types, module)
+    return backend
+
+
+# Modules are imported when backends are used for the first time
+register_backend('json', input_types=string_types + (bytes, bytearray), module='json')
+if is_installed('ujson'):
+    register_backend('ujson', input_types=string_types + (bytes, ), module='ujson')
+if is_installed('orjson'):
+    register_backend('orjson', input_types=string_types + (bytes, bytearray, memoryview), module='orjson')
+
+
+def detect_backend():
+    """
+    The fastest of registered backends. If it is not `json`, content, which it fails to decode, is passed to `json`.
+    """
+    for name in PREFERENCE:
+        if name in BACKENDS:
+            backend = BACKENDS[name]
+            break
+    else:
+        backend = BACKENDS['json']
+    if backend is BACKENDS['json']:
+        return backend
+    detected = _detected.get(name)
+    if detected is None or detected.backend is not backend:
+        detected = _detected[name] = FallbackBackend(backend, BACKENDS['json'])
+    return detected
+
+
+def get_backend(backend=None):
+    """
+    Resolves backend name, decoder callable or `JSONBackend` instance. None - the default backend.
+    """
+    if backend is None:
+        return _default_backend or detect_backend()
+    if isinstance(backend, JSONBackend):
+        return backend
+    if isinstance(backend, string_types):
+        try:
+            return BACKENDS[backend]
+        except KeyError:
+            raise ValueError('Unknown JSON backend: %s' % backend)
+    if callable(backend):
+        return JSONBackend(getattr(backend, '__name__', repr(backend)), backend)
+    raise TypeError('JSON backend should be a name, a callable or a JSONBackend instance')
+
+
+def set_default_backend(backend=None):
+    """
+    Sets backend for all parsers without their own one. None restores autodetection.
+    """
+    global _default_backend
+    _default_backend = None if backend is None else get_backend(backend)
@@ -0,0 +1,289 @@
+# coding: utf-8
+"""
+Incremental JSON reader, which extracts only values of requested queries.
+Subtrees, which are not requested, are skipped without building Python objects
+and reading stops as soon as all queries are resolved.
+"""
+import codecs
+import re
+
+from ._compat import string_types
+from .helpers import FanOutQuery, lookup, lookup_all
+
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Part of string up to the closing quote or the end of buffer. Unfinished escape sequence is not included
+STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+SCALAR = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null')
+# Characters, which could follow complete scalar
+DELIMITERS = ' \t\n\r,]}'
+# Tokens, that affect nesting level. Lone quote means string, which is not finished in buffer. Used to skip subtrees
+NESTING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]|"', re.DOTALL)
+
+
+class AllResolved(Exception):
+    """
+    Raises when there is nothing to read anymore.
+    """
+
+
+def iter_chunks(source, size):
+    """
+    Yields text chunks from text, bytes or file-like object. Bytes are decoded incrementally as UTF-8.
+    """
+    if isinstance(source, string_types):
+        for start in range(0, len(source), size):
+            yield source[start:start + size]
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for start in range(0, len(view), size):
+            yield decoder.decode(view[start:start + size])
+        yield decoder.decode(b'', True)
+    else:
+        decoder = None
+        while True:
+            chunk = source.read(size)
+            if not chunk:
+                break
+            if not isinstance(chunk, string_types):
+                decoder = decoder or codecs.getincrementaldecoder('utf-8')()
+                chunk = decoder.decode(chunk)
+            yield chunk
+        if decoder is not None:
+            yield decoder.decode(b'', True)
+
+
+class StreamResolver(object):
+    """
+    Resolves compiled dictionary queries in the same way as `helpers.lookup` does over the whole document.
+    """
+
+    def __init__(self, source, queries, loads, chunk_size=65536):
+        self.chunks = iter_chunks(source, chunk_size)
+        self.queries = set(queries)
+        self.loads = loads
+        self.results = {}
+        self.buffer = ''
+        self.position = 0
+        self.exhausted = False
+        # Start of the value, which is being materialized, and its parts from previous chunks
+        self.mark = None
+        self.captured = []
+
+    def resolve(self):
+        if self.queries:
+            try:
+                self.resolve_value([(query, 0) for query in self.queries])
+            except AllResolved:
+                pass
+        return self.results
+
+    # Low-level reading
+
+    def fill(self):
+        """
+        Reads next chunk. Already processed part of buffer is dropped.
+        """
+        for chunk in self.chunks:
+            if self.mark is not None:
+                self.captured.append(self.buffer[self.mark:self.position])
+                self.mark = 0
+            self.buffer = self.buffer[self.position:] + chunk
+            self.position = 0
+            return True
+        self.exhausted = True
+        return False
+
+    def match(self, pattern, delimited=False):
+        """
+        Matches pattern at current position. Reads more data while match can be continued in the next chunk.
+        `delimited` - match should be followed by delimiter, e.g. number, split by chunk after "." or "e",
+        is not complete yet.
+        """
+        while True:
+            match = pattern.match(self.buffer, self.position)
+            if (
+                match is not None and match.end() < len(self.buffer) and
+                (not delimited or self.buffer[match.end()] in DELIMITERS)
+            ) or not self.fill():
+                return match
+
+    def peek(self):
+        self.position = self.match(WHITESPACE).end()
+        return self.buffer[self.position:self.position + 1]
+
+    def expect(self, pattern, delimited=False):
+        match = self.match(pattern, delimited)
+        if match is None or match.end() == match.start():
+            raise ValueError('Invalid JSON at position %s' % self.position)
+        self.position = match.end()
+        return match.group()
+
+    def expect_char(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError('Expected one of %r, got %r' % (chars, char))
+        self.position += 1
+        return char
+
+    def skip_string(self, parts=None):
+        """
+        Reads string, which starts at current position. Long strings are read chunk by chunk - already scanned
+        text is not scanned again and is dropped from buffer, unless it is collected into `parts`.
+        """
+        start = self.position
+        self.position += 1
+        while True:
+            end = STRING_BODY.match(self.buffer, self.position).end()
+            if end < len(self.buffer) and self.buffer[end] == '"':
+                self.position = end + 1
+                if parts is not None:
+                    parts.append(self.buffer[start:self.position])
+                return
+            if parts is not None:
+                parts.append(self.buffer[start:end])
+            self.position = end
+            if not self.fill():
+                raise ValueError('Unterminated string')
+            start = self.position
+
+    def read_key(self):
+        if self.peek() != '"':
+            raise ValueError('Expected object key at position %s' % self.position)
+        parts = []
+        self.skip_string(parts)
+        raw = ''.join(parts)
+        key = raw[1:-1] if '\\' not in raw else self.loads(raw)
+        self.expect_char(':')
+        return key
+
+    def skip_value(self):
+        char = self.peek()
+        if char == '"':
+            self.skip_string()
+        elif char and char in '{[':
+            depth = 0
+            while True:
+                for token in NESTING.finditer(self.buffer, self.position):
+                    char = token.group()
+                    if char == '"':
+                        # Unfinished string is read incrementally, then search continues after it
+                        self.position = token.start()
+                        self.skip_string()
+                        break
+                    if char[0] == '"':
+                        continue
+                    depth += 1 if char in '{[' else -1
+                    if not depth:
+                        self.position = token.end()
+                        return
+                else:
+                    self.position = len(self.buffer)
+                    if not self.fill():
+                        raise ValueError('Unexpected end of JSON')
+        else:
+            self.expect(SCALAR, delimited=True)
+
+    def read_value(self):
+        """
+        Builds Python object only for the current value.
+        """
+        self.peek()
+        self.mark, self.captured = self.position, []
+        self.skip_value()
+        self.captured.append(self.buffer[self.mark:self.position])
+        self.mark = None
+        return self.loads(''.join(self.captured))
+
+    # Queries resolving. Every query is a pair of compiled query and number of already passed steps
+
+    def set_result(self, query, value):
+        self.results[query] = value
+        self.queries.discard(query)
+
+    def set_missing(self, query, value=None):
+        self.set_result(query, [] if isinstance(query, FanOutQuery) else value)
+
+    def check_resolved(self):
+        if not self.queries:
+            raise AllResolved
+
+    def resolve_value(self, queries):
+        char = self.peek()
+        if (
+            not char or char not in '{[' or
+            any(depth == len(query) for query, depth in queries) or
+            # Wildcards, slices and negative indexes require whole value
+            any(isinstance(query[depth][1], slice) for query, depth in queries) or
+            char == '[' and any((query[depth][1] or 0) < 0 for query, depth in queries)
+        ):
+            value = self.read_value()
+            for query, depth in queries:
+                if isinstance(query, FanOutQuery):
+                    self.set_result(query, lookup_all(value, query[depth:]))
+                else:
+                    self.set_result(query, lookup(value, query[depth:]))
+        elif char == '{':
+            self.resolve_object(queries)
+        else:
+            self.resolve_array(queries)
+        self.check_resolved()
+
+    def resolve_empty(self, queries, closing, value):
+        self.position += 1
+        if self.peek() != closing:
+            return False
+        self.position += 1
+        for query, depth in queries:
+            self.set_missing(query, value)
+        return True
+
+    def resolve_object(self, queries):
+        if self.resolve_empty(queries, '}', {}):
+            return
+        by_key = {}
+        for query, depth in queries:
+            by_key.setdefault(query[depth][0], []).append((query, depth + 1))
+        while True:
+            wanted = by_key.pop(self.read_key(), None)
+            if wanted:
+                self.resolve_value(wanted)
+            else:
+                self.skip_value()
+            if self.expect_char(',}') == '}':
+                break
+        for remaining in by_key.values():
+            for query, depth in remaining:
+                self.set_missing(query)
+
+    def resolve_array(self, queries):
+        if self.resolve_empty(queries, ']', []):
+            return
+        by_index = {}
+        for query, depth in queries:
+            index = query[depth][1]
+            if index is None:
+                self.set_missing(query)
+            else:
+                by_index.setdefault(index, []).append((query, depth + 1))
+        index = 0
+        while True:
+            wanted = by_index.pop(index, None)
+            if wanted:
+                self.resolve_value(wanted)
+            else:
+                self.skip_value()
+            if self.expect_char(',]') == ']':
+                break
+            index += 1
+        for remaining in by_index.values():
+            for query, depth in remaining:
+                self.set_missing(query)
+
+
+def resolve_queries(source, queries, loads, chunk_size=65536):
+    """
+    Returns mapping of queries to their values in JSON document from text, bytes or file-like object.
+    """
+    return StreamResolver(source, queries, loads, chunk_size).resolve()
@@ -0,0 +1,164 @@
+# coding: utf-8
+"""
+Finds first matches of many regular expressions in a single pass over content.
+"""
+import re
+import sys
+
+
+# Numbered back-references and conditional groups change their meaning, when pattern becomes a part of alternation
+GROUP_REFERENCE = re.compile(r'\\[1-9]|\(\?\(|\(\?P=')
+GLOBAL_FLAGS = re.compile(r'^\(\?[aiLmsux]+\)')
+# Alternations from every pattern to the last one could be compiled, so their size is limited
+MAX_PATTERNS = 100
+# Older versions of `re` support at most 100 groups in one expression
+MAX_GROUPS = 99 if sys.version_info < (3, 5) else None
+
+
+def findall_item(whole, groups, default):
+    """
+    Item of `findall` results for the whole match and values of its groups. Unmatched groups get `default` value -
+    empty string of the pattern's type.
+    """
+    if not groups:
+        return whole
+    groups = tuple(default if value is None else value for value in groups)
+    if len(groups) == 1:
+        return groups[0]
+    return groups
+
+
+def first_match(match):
+    """
+    Converts match object into the first item of `findall` results.
+    """
+    return findall_item(match.group(), match.groups(), match.re.pattern[:0])
+
+
+def is_combinable(pattern):
+    source = pattern.pattern
+    if isinstance(source, bytes):
+        source = source.decode('latin-1')
+    return not pattern.groupindex and not GROUP_REFERENCE.search(source) and not GLOBAL_FLAGS.match(source)
+
+
+class Alternation(object):
+    """
+    Patterns with the same flags, joined into one expression, which finds positions, where any of them matches.
+    To know patterns, matched there, alternations of patterns from every one to the last are matched at that
+    position. Every alternative there is followed by an empty group, so the first matched pattern is known
+    by the last closed group. These alternations are compiled on the first usage and kept for all documents.
+    """
+
+    def __init__(self, patterns, source_type, flags):
+        self.names, self.patterns = zip(*sorted(patterns.items()))
+        self.source_type = source_type
+        self.flags = flags
+        self.guard = self.compile('(?:%s)')[0]
+        self.tails = [None] * len(self.patterns)
+
+    def compile(self, template, start=0):
+        """
+        Returns compiled alternation of patterns from `start` and mapping of its marker groups to pattern indexes.
+        In verbose patterns a trailing comment would hide the rest of expression, so every alternative is closed
+        on a new line.
+        """
+        separator = '|'
+        if self.flags & re.VERBOSE:
+            template = template.replace('%s', '%s\n')
+        if self.source_type is bytes:
+            template, separator = template.encode('ascii'), b'|'
+        markers = {}
+        group = 0
+        for index in range(start, len(self.patterns)):
+            group += self.patterns[index].groups + 1
+            markers[group] = index
+        source = separator.join(template % pattern.pattern for pattern in self.patterns[start:])
+        return re.compile(source, self.flags), markers
+
+    def get_tail(self, start):
+        tail = self.tails[start]
+        if tail is None:
+            tail = self.tails[start] = self.compile('(?:%s)()', start)
+        return tail
+
+    def scan(self, content, results):
+        unresolved = set(range(len(self.patterns)))
+        position = 0
+        while unresolved:
+            found = self.guard.search(content, position)
+            if found is None:
+                break
+            position = found.start()
+            start = 0
+            while start < len(self.patterns):
+                tail, markers = self.get_tail(start)
+                found = tail.match(content, position)
+                if found is None:
+                    break
+                marker = found.lastindex
+                index = markers[marker]
+                # Position could be found by already resolved pattern
+                if index in unresolved:
+                    unresolved.discard(index)
+                    groups = [found.group(group) for group in range(marker - self.patterns[index].groups, marker)]
+                    results[self.names[index]] = findall_item(found.group(), groups, tail.pattern[:0])
+                start = index + 1
+            position += 1
+
+
+def split_groups(patterns):
+    """
+    Splits patterns into parts, which fit into limits of patterns and groups in one alternation.
+    """
+    parts = [{}]
+    size = 0
+    for name, pattern in sorted(patterns.items()):
+        groups = pattern.groups + 1
+        if parts[-1] and (len(parts[-1]) == MAX_PATTERNS or MAX_GROUPS and size + groups > MAX_GROUPS):
+            parts.append({})
+            size = 0
+        parts[-1][name] = pattern
+        size += groups
+    return parts
+
+
+class MultiPatternScanner(object):
+    """
+    Resolves first matches of compiled patterns. Patterns with the same flags are joined into one alternation,
+    which finds the leftmost position, where any of them matches. Still unresolved patterns, that match there,
+    are resolved and the scan continues from the next position, so content is read once and reading stops
+    when everything is resolved. Alternations are compiled once per scanner, not per document.
+    Patterns with back-references, named groups or inline global flags are searched separately.
+    """
+
+    def __init__(self, patterns):
+        self.names = tuple(patterns)
+        grouped = {}
+        self.separate = {}
+        for name, pattern in patterns.items():
+            if is_combinable(pattern):
+                key = (type(pattern.pattern), pattern.flags)
+                grouped.setdefault(key, {})[name] = pattern
+            else:
+                self.separate[name] = pattern
+        self.groups = []
+        for (source_type, flags), group in grouped.items():
+            for part in split_groups(group):
+                if len(part) == 1:
+                    self.separate.update(part)
+                else:
+                    self.groups.append(Alternation(part, source_type, flags))
+
+    def scan(self, content):
+        """
+        Returns mapping of names to first matches. Names without matches are omitted.
+        """
+        results = {}
+        for name, pattern in self.separate.items():
+            match = pattern.search(content)
+            if match is not None:
+                results[name] = first_match(match)
+        for alternation in self.groups:
+            alternation.scan(content, results)
+        return results
@@ -3,20 +3,50 @@
 Classes for fabrics of interfaces.
 Generates interfaces dynamically from given settings.
 """
-from ._compat import etree
+import os
+from functools import partial
+from io import BytesIO
+
+from ._compat import etree, get_yaml_loader, yaml
 from .interfaces import (
     XPathInterface,
     XMLInterface,
     XMLObjectifyInterface,
     JSONInterface,
+    JSONStreamInterface,
     YAMLInterface,
     AJAXInterface,
     RegExpInterface,
     CSVInterface,
     CombinedInterface,
     IndexOfInterface,
+    build_attributes_index,
+)
+from .automaton import Automaton, THRESHOLD
+from .exceptions import ResponseParseError
+from .batch import (
+    is_process_pool,
+    map_parser,
+    parse_content,
+    parse_all_content,
+    parse_only_content,
+    preload_content,
 )
-from .helpers import attach_attribute, attach_cached_property
+from .multipattern import MultiPatternScanner
+from .helpers import CacheStats, LRUCache, attach_attribute, attach_cached_property
+from .jsonbackends import get_backend
+from .resultcache import describe, fingerprint, get_path
+from .instrumentation import instrument_class, timed
+
+
+def copy_settings(settings):
+    """
+    Copies settings deep enough to detect their changes - complex settings are dictionaries themselves.
+    """
+    return dict(
+        (name, dict(value) if isinstance(value, dict) else value)
+        for name, value in settings.items()
+    )
 
 
 class BaseParser(object):
@@ -25,6 +55,19 @@ class BaseParser(object):
     """
     interface_class = None
     strip = False
+    content = None
+    # Executor for asyncio API, None means default executor of event loop
+    executor = None
+    # Maximal number of cached results of `parse` calls per interface, None - unlimited, 0 - no caching
+    cache_size = 1024
+    # Sink for timings of parsing phases, see `pyanyapi.instrumentation`. None disables instrumentation
+    instrumentation = None
+    # Cache of `parse_all` results, see `pyanyapi.resultcache`. None disables caching
+    result_cache = None
+    # `parse_all` returns compact records instead of dictionaries and releases interfaces state
+    compact = False
+    # Settings snapshot, class options and interface class, generated from them
+    _interface_cache = None
 
     def __init__(self, settings=None, strip=None):
         if strip is not None:
@@ -33,17 +76,20 @@ class BaseParser(object):
         if settings:
             parents_settings.update(settings)
         self.settings = parents_settings
+        if self.interface_class is not None:
+            # Compiles settings, so malformed queries fail as early as possible
+            self.get_interface_class()
 
     @property
     def attributes(self):
-        extra_attributes = []
-        for name in dir(self):
-            if name == 'attributes':
-                continue
-            attr = getattr(self, name)
-            if hasattr(attr, '_interface_property') or hasattr(attr, '_interface_method'):
-                extra_attributes.append(name)
-        return list(self.settings.keys()) + extra_attributes
+        return list(self.get_interface_class()._attributes)
+
+    @property
+    def cache_stats(self):
+        """
+        Cache usage counters of all interfaces, generated since the last settings change.
+        """
+        return self.get_interface_class().cache_stats
 
     def get_parents_settings(self):
         """
@@ -58,65 +104,277 @@ class BaseParser(object):
         """
         Generates new class instance with desired attributes.
         """
-        self.content = self.prepare_content(content)
+        if self.instrumentation is None:
+            content = self.prepare_content(content)
+        else:
+            content = timed(
+                self.prepare_content, self.instrumentation, 'prepare_content', self.__class__.__name__
+            )(content)
+        self.content = content
+        return self.create_interface(content)
 
-        class Interface(self.interface_class):
-            pass
+    def from_parsed(self, parsed_content):
+        """
+        Generates interface over already parsed content - lxml element tree, decoded JSON document, etc.
+        """
+        interface = self.create_interface(None)
+        interface._parsed_content = parsed_content
+        return interface
 
-        self.setup_class(Interface)
+    def create_interface(self, content):
+        interface_class = self.get_interface_class()
 
         init_kwargs = self.get_interface_kwargs()
+        # `self.content` could be already changed by another thread
+        init_kwargs['content'] = content
 
-        return Interface(**init_kwargs)
+        return interface_class(**init_kwargs)
 
     def parse_all(self, content=''):
+        if self.result_cache is not None:
+            return self.result_cache.get_or_parse(self, content)
         return self.parse(content).parse_all()
 
+    def parse_only(self, content, keys):
+        """
+        Evaluates only given attributes and returns results as dictionary.
+        """
+        return self.parse(content).parse_only(keys)
+
+    def iter_all(self, content=''):
+        """
+        Lazily yields (name, result) pairs of all attributes as they are computed.
+        """
+        return self.parse(content).iter_all()
+
+    def parse_many(self, iterable, executor=None, workers=None, chunksize=1):
+        """
+        Lazily parses every item of iterable. Interfaces are yielded in the same order.
+        Content is parsed serially or, when `executor` is given, in a thread pool - 'thread' or
+        any `concurrent.futures.Executor`. Interfaces can't be passed between processes,
+        use `parse_all_many` with process pools.
+        """
+        if executor is not None and is_process_pool(executor):
+            raise ValueError('Interfaces can not be transferred between processes, use `parse_all_many` instead')
+        func = parse_content if executor is None else preload_content
+        return map_parser(self, func, iterable, executor, workers, chunksize)
+
+    def parse_all_many(self, iterable, executor=None, workers=None, chunksize=1):
+        """
+        Lazily parses every item of iterable and yields `parse_all` results in the same order.
+        `executor` could be None (serial processing), 'thread', 'process' or any `concurrent.futures.Executor`.
+        At most `2 * workers` chunks of `chunksize` items are in flight at any moment.
+        """
+        return map_parser(self, parse_all_content, iterable, executor, workers, chunksize)
+
+    def parse_only_many(self, iterable, keys, executor=None, workers=None, chunksize=1):
+        """
+        Lazily parses every item of iterable and yields `parse_only` results in the same order.
+        Executor options are the same as in `parse_all_many`.
+        """
+        return map_parser(self, partial(parse_only_content, tuple(keys)), iterable, executor, workers, chunksize)
+
+    # asyncio API lives in a separate module, which is imported on first usage.
+
+    def aparse(self, content='', executor=None, timeout=None):
+        """
+        Coroutine version of `parse`. Content is parsed in executor, parser's `executor` is used by default.
+        """
+        from . import aio
+
+        return aio.aparse(self, content, executor, timeout)
+
+    def aparse_all(self, content='', executor=None, timeout=None):
+        """
+        Coroutine version of `parse_all`.
+        """
+        from . import aio
+
+        return aio.aparse_all(self, content, executor, timeout)
+
+    def aparse_many(self, iterable, executor=None, timeout=None, concurrency=4):
+        """
+        Asynchronous iterator over interfaces for every item of (async) iterable, in the same order.
+        At most `concurrency` items are parsed at any moment. `timeout` is applied to every item.
+        """
+        from . import aio
+
+        return aio.aparse_many(self, iterable, executor, timeout, concurrency)
+
+    def aparse_all_many(self, iterable, executor=None, timeout=None, concurrency=4):
+        """
+        Asynchronous iterator over `parse_all` results for every item of (async) iterable, in the same order.
+        """
+        from . import aio
+
+        return aio.aparse_all_many(self, iterable, executor, timeout, concurrency)
+
     def get_interface_kwargs(self):
         return {'content': self.content, 'strip': self.strip}
 
+    def get_compile_kwargs(self):
+        """
+        Options to compile settings with.
+        """
+        return {}
+
     def prepare_content(self, content):
         """
         Hook to provide way to transform content.
         """
         return content
 
+    def get_interface_class(self):
+        """
+        Returns interface class with all dynamic attributes attached.
+        It is generated once and re-used until parser settings are changed.
+        """
+        cached = self._interface_cache
+        options = self.get_class_options()
+        if cached is None or cached[0] != self.settings or cached[1] != options:
+
+            class Interface(self.interface_class):
+                pass
+
+            self.setup_class(Interface)
+            cached = self._interface_cache = (copy_settings(self.settings), options, Interface)
+        return cached[2]
+
+    def get_fingerprint(self):
+        """
+        Hash of everything, what parsing results depend on - settings, interface options and properties code.
+        It is stable between restarts and used as a part of result cache keys.
+        """
+        interface_class = self.get_interface_class()
+        kwargs = self.get_interface_kwargs()
+        for name in ('content', 'attributes_index'):
+            kwargs.pop(name, None)
+        # Sub-parser classes from settings could be changed without re-generation of the interface class
+        options = describe([kwargs, [
+            settings['parser'] for settings in self.settings.values()
+            if isinstance(settings, dict) and isinstance(settings.get('parser'), type)
+        ]])
+        # Interface class is re-generated on settings changes, so cached value is dropped with it
+        cached = interface_class.__dict__.get('_fingerprint')
+        if cached is None or cached[0] != options:
+            properties = [
+                getattr(self.__class__, name) for name in interface_class.property_names
+                if getattr(getattr(self.__class__, name, None), '_interface_property', False)
+            ]
+            cached = (options, fingerprint(
+                [self.__class__, interface_class.__bases__, self.settings, options, properties, self.compact]
+            ))
+            interface_class._fingerprint = cached
+        return cached[1]
+
+    def get_class_options(self):
+        """
+        Everything except settings, what generated interface class depends on.
+        """
+        return self.interface_class, self.get_compile_kwargs(), self.cache_size, self.instrumentation, self.compact
+
     def setup_class(self, cls):
         """
         Attaches dynamic properties & methods.
         """
+        cls.cache_size = self.cache_size
+        cls.cache_stats = CacheStats()
+        cls._parser = self
+        cls.compact = self.compact
+        if self.instrumentation is not None:
+            instrument_class(cls, self.instrumentation, self.__class__.__name__)
         self.process_settings(cls)
-        self.process_decorators(cls)
+        cls._attributes = tuple(self.settings) + tuple(self.process_decorators(cls))
+        cls.property_names = cls.collect_property_names()
 
     def process_settings(self, cls):
         """
         Generates methods, based on settings.
         """
+        compile_kwargs = self.get_compile_kwargs()
+        cls.compiled_settings = {}
         for name, settings in self.settings.items():
-            attr = cls.init_attr(settings)
-            attach_cached_property(cls, name, attr)
+            compiled = cls.compiled_settings[name] = cls.compile_settings(settings, **compile_kwargs)
+            attach_cached_property(cls, name, self.instrument_attribute(cls.init_attr(compiled), name))
+
+    def instrument_attribute(self, attr, name):
+        if self.instrumentation is None:
+            return attr
+        return timed(attr, self.instrumentation, 'attribute', name)
+
+    def is_overridden(self, name):
+        """
+        Setting is replaced with a method, decorated with @interface_property or @interface_method.
+        """
+        return getattr(getattr(self.__class__, name, None), '_interface_property', False)
 
     def process_decorators(self, cls):
         """
         Re-attach all attributes, which is decorated with
         @interface_property or @interface_method decorators to new class.
+        Returns names of re-attached attributes.
         """
-        for name in dir(self):
-            attr = getattr(self, name)
+        names = []
+        for name in dir(self.__class__):
+            attr = getattr(self.__class__, name)
             if getattr(attr, '_interface_property', False):
-                attach_cached_property(cls, name, attr)
+                attach_cached_property(cls, name, self.instrument_attribute(attr, name))
             elif getattr(attr, '_interface_method', False):
                 attach_attribute(cls, name, attr)
+            else:
+                continue
+            names.append(name)
+        return names
 
     def __and__(self, other):
         return CombinedParser(self, other)
 
+    def __getstate__(self):
+        """
+        Generated classes can't be pickled, they are rebuilt on first usage.
+        """
+        state = self.__dict__.copy()
+        for name in ('content', '_interface_cache', '_attributes_index_cache'):
+            state.pop(name, None)
+        return state
+
+    def __reduce__(self):
+        """
+        Parsers are restored with `restore_parser`, so other processes rebuild compiled state
+        only once for every distinct parser, not for every task it is sent with.
+        """
+        state = self.__getstate__()
+        key = (os.getpid(), get_path(self.__class__), self.get_fingerprint(), fingerprint(state))
+        return restore_parser, (self.__class__, key, state)
+
+
+# Parsers, restored from other processes, by their keys
+_restored_parsers = LRUCache(64)
+
+
+def restore_parser(cls, key, state):
+    """
+    Returns already restored parser with the same state, if any. Copies within the same process are always new objects.
+    """
+    if key[0] == os.getpid():
+        parser = cls.__new__(cls)
+        parser.__dict__.update(state)
+        return parser
+    parser = _restored_parsers.get(key)
+    # Different classes could have the same path, e.g. ones, generated by the same function
+    if type(parser) is not cls:
+        parser = _restored_parsers[key] = cls.__new__(cls)
+        parser.__dict__.update(state)
+    return parser
+
 
 class CombinedParser(BaseParser):
     """
     Combines multiple parsers in one. This can also be in different types.
     """
     interface_class = CombinedInterface
+    # Interface classes of combined parsers and attributes index, built from them
+    _attributes_index_cache = None
 
     def __init__(self, *parsers, **kwargs):
         if parsers:
@@ -127,17 +385,33 @@ class CombinedParser(BaseParser):
     def attributes(self):
         return super(CombinedParser, self).attributes + sum([parser.attributes for parser in self.parsers], [])
 
+    def get_attributes_index(self):
+        """
+        Maps attribute names to combined parsers. Rebuilt only when some of combined parsers is changed.
+        """
+        interface_classes = tuple(parser.get_interface_class() for parser in self.parsers)
+        cached = self._attributes_index_cache
+        if cached is None or cached[0] != interface_classes:
+            cached = self._attributes_index_cache = (interface_classes, build_attributes_index(self.parsers))
+        return cached[1]
+
     def get_interface_kwargs(self):
         kwargs = super(CombinedParser, self).get_interface_kwargs()
         kwargs['parsers'] = self.parsers
+        kwargs['attributes_index'] = self.get_attributes_index()
         return kwargs
 
 
 class LXMLParser(BaseParser):
 
-    def parse(self, *args, **kwargs):
+    def __init__(self, *args, **kwargs):
         assert etree, 'Using %s, but lxml is not installed' % self.__class__.__name__
-        return super(LXMLParser, self).parse(*args, **kwargs)
+        super(LXMLParser, self).__init__(*args, **kwargs)
+
+    def process_settings(self, cls):
+        super(LXMLParser, self).process_settings(cls)
+        if issubclass(cls, XPathInterface):
+            cls.share_queries()
 
 
 class HTMLParser(LXMLParser):
@@ -154,25 +428,111 @@ class XMLParser(LXMLParser):
             declaration, replacement = 'encoding="UTF-8"', ''
         return content.replace(declaration, replacement).replace(declaration.lower(), replacement)
 
+    def iterparse(self, source, tag, **kwargs):
+        """
+        Lazily parses XML from file name, file-like object or bytes and yields `parse_all` results
+        for every `tag` element. Settings are evaluated against every record separately - absolute
+        expressions start from the record element. Processed elements are cleared, so memory usage
+        doesn't depend on the document size. Extra kwargs are passed to `lxml.etree.iterparse`.
+        """
+        records = etree.iterparse(
+            BytesIO(source) if isinstance(source, bytes) else source, events=('end', ), tag=tag, **kwargs
+        )
+        while True:
+            try:
+                _, element = next(records)
+            except StopIteration:
+                return
+            except etree.XMLSyntaxError:
+                raise ResponseParseError(self.get_interface_class()._error_message, source)
+            # Already processed records are still referenced by their parent
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+            yield self.from_parsed(etree.ElementTree(element)).parse_all()
+            element.clear(keep_tail=True)
+
 
 class XMLObjectifyParser(XMLParser):
     interface_class = XMLObjectifyInterface
 
 
-class JSONParser(BaseParser):
+class JSONBackendMixin(object):
+    """
+    Decodes JSON with chosen backend - its name, decoder callable or `JSONBackend` instance.
+    See `pyanyapi.jsonbackends`.
+    """
+    # None - the default backend, which could be changed with `jsonbackends.set_default_backend`
+    json_backend = None
+
+    def get_class_options(self):
+        return super(JSONBackendMixin, self).get_class_options() + (self.json_backend, )
+
+    def setup_class(self, cls):
+        # Names are resolved here, so unknown backends fail early
+        cls.json_backend = None if self.json_backend is None else get_backend(self.json_backend)
+        super(JSONBackendMixin, self).setup_class(cls)
+
+
+class DictParserMixin(object):
+    # Resolve all settings in `parse_all` with a single traversal of parsed content
+    single_pass = True
+
+    def get_class_options(self):
+        return super(DictParserMixin, self).get_class_options() + (self.single_pass, )
+
+    def process_settings(self, cls):
+        super(DictParserMixin, self).process_settings(cls)
+        cls.trie = None
+        # Instrumented attributes are evaluated separately to report their own timings
+        if self.single_pass and self.instrumentation is None:
+            # Settings, overridden by decorated methods, are not resolved by trie
+            cls.trie = cls.build_trie(name for name in self.settings if not self.is_overridden(name))
+
+
+class JSONParser(DictParserMixin, JSONBackendMixin, BaseParser):
     interface_class = JSONInterface
 
+    def __init__(self, settings=None, strip=None, streaming=False, backend=None):
+        if streaming:
+            self.interface_class = JSONStreamInterface
+        if backend is not None:
+            self.json_backend = backend
+        super(JSONParser, self).__init__(settings, strip)
+
 
-class YAMLParser(BaseParser):
+class YAMLParser(DictParserMixin, BaseParser):
     interface_class = YAMLInterface
 
+    def iterparse(self, source):
+        """
+        Lazily parses multi-document YAML from text, bytes or file-like object and yields `parse_all` results
+        for every document. Documents are loaded one by one, only the current one is kept in memory.
+        """
+        interface_class = self.get_interface_class()
+        documents = yaml.load_all(self.prepare_content(source), Loader=interface_class.loader or get_yaml_loader())
+        while True:
+            try:
+                document = next(documents)
+            except StopIteration:
+                return
+            except yaml.error.YAMLError:
+                raise ResponseParseError(interface_class._error_message, source)
+            yield self.from_parsed(document).parse_all()
+
 
-class AJAXParser(LXMLParser):
+class AJAXParser(JSONBackendMixin, LXMLParser):
     interface_class = AJAXInterface
 
+    def __init__(self, settings=None, strip=None, backend=None):
+        if backend is not None:
+            self.json_backend = backend
+        super(AJAXParser, self).__init__(settings, strip)
+
 
 class RegExpParser(BaseParser):
     interface_class = RegExpInterface
+    # Resolve all settings in `parse_all` with a single pass over content
+    single_pass = True
 
     def __init__(self, settings=None, strip=None, flags=0):
         self.flags = flags
@@ -183,6 +543,25 @@ class RegExpParser(BaseParser):
         kwargs['flags'] = self.flags
         return kwargs
 
+    def get_compile_kwargs(self):
+        kwargs = super(RegExpParser, self).get_compile_kwargs()
+        kwargs['flags'] = self.flags
+        return kwargs
+
+    def get_class_options(self):
+        return super(RegExpParser, self).get_class_options() + (self.single_pass, )
+
+    def process_settings(self, cls):
+        super(RegExpParser, self).process_settings(cls)
+        # Settings, overridden by decorated methods, are not resolved by scanner
+        patterns = dict(
+            (name, compiled) for name, compiled in cls.compiled_settings.items()
+            if hasattr(compiled, 'search') and not self.is_overridden(name)
+        )
+        # Instrumented attributes are evaluated separately to report their own timings
+        single_pass = self.single_pass and self.instrumentation is None
+        cls.scanner = MultiPatternScanner(patterns) if single_pass and patterns else None
+
 
 class CSVParser(BaseParser):
     interface_class = CSVInterface
@@ -199,6 +578,17 @@ class CSVParser(BaseParser):
 
 class IndexOfParser(BaseParser):
     interface_class = IndexOfInterface
+    # Minimal number of settings to look for all of them with a single automaton scan, None disables it
+    automaton_threshold = THRESHOLD
+
+    def get_class_options(self):
+        return super(IndexOfParser, self).get_class_options() + (self.automaton_threshold, )
+
+    def process_settings(self, cls):
+        super(IndexOfParser, self).process_settings(cls)
+        needles = [compiled for compiled in cls.compiled_settings.values() if isinstance(compiled, str)]
+        threshold = self.automaton_threshold
+        cls.automaton = Automaton(needles) if threshold is not None and len(needles) >= threshold else None
 
     def prepare_content(self, content):
         if isinstance(content, bytes):
@@ -0,0 +1,178 @@
+# coding: utf-8
+"""
+Opt-in cache of `parse_all` results, keyed by content hash and fingerprint of parser settings.
+Unchanged documents are not parsed again and changed settings give different keys, so stale results are never used:
+
+    parser.result_cache = ResultCache(maxsize=1024, path='results.sqlite')
+
+Results are kept in memory LRU cache and, optionally, in SQLite database, which survives restarts.
+Results, which can't be pickled (e.g. lxml elements), are kept in memory only.
+"""
+import threading
+
+from ._compat import LazyModule, string_types
+from .helpers import CacheStats, LRUCache
+
+
+hashlib = LazyModule('hashlib')
+pickle = LazyModule('pickle')
+sqlite3 = LazyModule('sqlite3')
+
+
+def get_digest(data):
+    try:
+        hasher = hashlib.blake2b(digest_size=16)
+    except AttributeError:  # Python < 3.6
+        hasher = hashlib.sha1()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def get_path(value):
+    return '%s.%s' % (value.__module__, getattr(value, '__qualname__', value.__name__))
+
+
+def describe(value):
+    """
+    Text representation of settings, which is stable between restarts.
+    """
+    if isinstance(value, type):
+        if hasattr(value, 'get_fingerprint'):
+            # Parser classes, e.g. sub-parsers in settings, produce results according to their settings & properties
+            properties = dict(
+                (name, getattr(value, name)) for name in dir(value)
+                if getattr(getattr(value, name), '_interface_property', False)
+            )
+            return '%s(%s, %s)' % (get_path(value), describe(getattr(value, 'settings', None)), describe(properties))
+        return get_path(value)
+    if hasattr(value, 'get_fingerprint'):
+        return '%s(%s)' % (get_path(type(value)), value.get_fingerprint())
+    if isinstance(value, dict):
+        return '{%s}' % ', '.join(sorted('%s: %s' % (describe(key), describe(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return '[%s]' % ', '.join(describe(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        # Order of items depends on hash seed
+        return 'set(%s)' % ', '.join(sorted(describe(item) for item in value))
+    if hasattr(value, 'co_code'):
+        return describe_code(value)
+    if hasattr(value, 'pattern') and hasattr(value, 'flags'):
+        return 're(%r, %s)' % (value.pattern, value.flags)
+    code = getattr(value, '__code__', None)
+    if code is not None:
+        return '%s<%s>' % (get_path(value), get_digest(describe_code(code).encode('utf-8')))
+    return repr(value)
+
+
+def describe_code(code):
+    """
+    Bytecode with constants and names, which it refers to. Nested code objects are described recursively.
+    """
+    return '%r|%s|%s' % (code.co_code, describe(code.co_consts), code.co_names)
+
+
+def fingerprint(value):
+    return get_digest(describe(value).encode('utf-8'))
+
+
+def get_content_key(content):
+    """
+    Hash of content. None for content, which can't be hashed without reading, like file-like objects.
+    """
+    # On Python 2 `str` is bytes and it is hashed as is
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return 'b' + get_digest(content)
+    if isinstance(content, string_types):
+        return 't' + get_digest(content.encode('utf-8', 'surrogatepass'))
+    return None
+
+
+class ResultCache(object):
+    """
+    Two-tier cache of parsing results - in-memory LRU cache with `maxsize` entries (None - unlimited)
+    and, if `path` is given, SQLite database. Cache is thread-safe. When it is transferred to another process,
+    the database is shared and memory tier starts empty.
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.memory = LRUCache(maxsize)
+        # Hits & misses of the persistent tier
+        self.disk_stats = CacheStats()
+        self._connection = None
+        self._lock = threading.RLock()
+
+    @property
+    def stats(self):
+        """
+        Usage counters of the memory tier.
+        """
+        return self.memory.stats
+
+    @property
+    def connection(self):
+        if self._connection is None and self.path is not None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB)')
+        return self._connection
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self.memory.get(key, default)
+            if value is not default or self.connection is None:
+                return value
+            row = self.connection.execute('SELECT value FROM results WHERE key = ?', (key, )).fetchone()
+            if row is None:
+                self.disk_stats.add('misses')
+                return default
+            self.disk_stats.add('hits')
+            value = self.memory[key] = pickle.loads(bytes(row[0]))
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self.memory[key] = value
+            if self.connection is not None:
+                try:
+                    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                except (pickle.PicklingError, TypeError, AttributeError):
+                    return
+                with self.connection:
+                    self.connection.execute(
+                        'INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)', (key, sqlite3.Binary(data))
+                    )
+
+    def get_or_parse(self, parser, content):
+        """
+        `parser.parse_all(content)` result from cache or freshly computed one.
+        """
+        content_key = get_content_key(content)
+        if content_key is None:
+            return parser.parse(content).parse_all()
+        key = '%s:%s' % (parser.get_fingerprint(), content_key)
+        result = self.get(key)
+        if result is None:
+            result = parser.parse(content).parse_all()
+            self.set(key, result)
+        # Callers get their own dictionaries, records are immutable
+        return dict(result) if isinstance(result, dict) else result
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            if self.connection is not None:
+                with self.connection:
+                    self.connection.execute('DELETE FROM results')
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __getstate__(self):
+        return {'maxsize': self.maxsize, 'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
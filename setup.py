@@ -39,8 +39,8 @@ test_requirements = ['pytest>=2.8.0,<3.0.0']
 
 if sys.version_info < (3, 3):
     test_requirements.append('mock==1.0.1')
-if sys.version_info[:2] == (3, 2):
-    test_requirements.append('coverage==3.7.1')
+if sys.version_info[0] == 2:
+    requirements.append('futures')
 
 if not JYTHON:
     if not PYPY:
@@ -72,12 +72,12 @@ setup(
         'Operating System :: OS Independent',
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2.6',
         'Programming Language :: Python :: 2.7',
-        'Programming Language :: Python :: 3.2',
         'Programming Language :: Python :: 3.3',
         'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: Implementation :: CPython',
         'Programming Language :: Python :: Implementation :: PyPy',
         'Programming Language :: Python :: Implementation :: Jython',
@@ -105,3 +105,47 @@ JYTHON = platform.system() == 'Java'
 lxml_is_supported = pytest.mark.skipif(PYPY3 or JYTHON, reason='lxml is not supported')
 lxml_is_not_supported = pytest.mark.skipif(not (PYPY3 or JYTHON), reason='Only on if lxml is supported')
 not_pypy = pytest.mark.skipif(PYPY, reason='PyPy is not supported')
+
+# Dictionary queries of all kinds and documents for them, shared by streaming and single traversal tests
+DICT_SETTINGS = {
+    'simple': 'container > test',
+    'index': 'container > list > 1',
+    'negative': 'container > list > -1',
+    'nested': 'container > list > 2 > inner',
+    'missing': 'container > missing > deeper',
+    'missing_index': 'container > list > 10',
+    'string_index': 'container > test > 0',
+    'wrong_index': 'container > list > key',
+    'falsy': 'container > empty > key',
+    'null': 'container > null > key',
+    'whole': 'container > list',
+    'escaped': 'escaped " key',
+    'children': {'base': 'container > list', 'children': 'inner'},
+    'wildcard': 'container > list > * > inner > *',
+    'slice': 'container > list > 1:',
+    'values': 'container > * > 0',
+}
+DICT_DOCUMENTS = (
+    {
+        'before': {'skipped': [1, 2, {'deep': '}]'}], 'other': 'text with \\"escapes\\"'},
+        'container': {
+            'test': 'value',
+            'list': [1, 'two', {'inner': [1, 2]}, True],
+            'empty': {},
+            'null': None,
+        },
+        'after': [1.5e10, -2, False, None],
+        'escaped " key': ' ü ',
+    },
+    {'container': []},
+    {'container': {'test': '', 'list': []}},
+    {'container': {'list': [[], {}, '']}},
+    [],
+    [1, 2],
+    'string',
+    0,
+    None,
+)
+
+# asyncio API requires Python 3.7+
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 7) else []
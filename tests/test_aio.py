@@ -0,0 +1,118 @@
+# coding: utf-8
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from .conftest import SimpleParser
+from pyanyapi.parsers import JSONParser
+
+
+CONTENTS = ['%s.%s' % (i, i + 1) for i in range(20)]
+
+
+class SlowParser(SimpleParser):
+    delay = 0.05
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def prepare_content(self, content):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return content
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_aparse_all():
+    parser = SimpleParser()
+    assert run(parser.aparse_all(CONTENTS[1])) == parser.parse_all(CONTENTS[1])
+
+
+def test_aparse():
+    parser = JSONParser({'test': 'container > test'})
+    parsed = run(parser.aparse('{"container": {"test": "value"}}'))
+    assert parsed.__dict__['_parsed_content'] == {'container': {'test': 'value'}}
+    assert parsed.test == 'value'
+
+
+def test_custom_executor():
+    parser = SimpleParser()
+    with ThreadPoolExecutor(1) as executor:
+        assert run(parser.aparse_all(CONTENTS[0], executor=executor)) == parser.parse_all(CONTENTS[0])
+        parser.executor = executor
+        assert run(parser.aparse_all(CONTENTS[0])) == parser.parse_all(CONTENTS[0])
+
+
+def test_timeout():
+    with pytest.raises(asyncio.TimeoutError):
+        run(SlowParser().aparse_all(CONTENTS[0], timeout=0.001))
+
+
+def test_cancellation():
+
+    async def main():
+        task = asyncio.ensure_future(SlowParser().aparse_all(CONTENTS[0]))
+        await asyncio.sleep(0)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        run(main())
+
+
+@pytest.mark.parametrize('all_results', (True, False))
+def test_aparse_many(all_results):
+    parser = SimpleParser()
+
+    async def main():
+        if all_results:
+            return [result async for result in parser.aparse_all_many(CONTENTS)]
+        return [result.parse_all() async for result in parser.aparse_many(CONTENTS)]
+
+    assert run(main()) == list(parser.parse_all_many(CONTENTS))
+
+
+def test_aparse_many_async_iterable():
+    parser = SimpleParser()
+
+    async def contents():
+        for content in CONTENTS:
+            yield content
+
+    async def main():
+        return [result async for result in parser.aparse_all_many(contents())]
+
+    assert run(main()) == list(parser.parse_all_many(CONTENTS))
+
+
+def test_concurrency_limit():
+    parser = SlowParser()
+    parser.delay = 0.01
+    consumed = []
+
+    def contents():
+        for content in CONTENTS:
+            consumed.append(content)
+            yield content
+
+    async def main():
+        results = parser.aparse_all_many(contents(), concurrency=2)
+        first = await results.__anext__()
+        assert len(consumed) <= 3
+        await results.aclose()
+        return first
+
+    with ThreadPoolExecutor(8) as executor:
+        parser.executor = executor
+        assert run(main()) == parser.parse_all(CONTENTS[0])
+    assert parser.max_active <= 2
@@ -0,0 +1,43 @@
+# coding: utf-8
+import pytest
+
+from ._compat import patch
+from pyanyapi import automaton
+from pyanyapi.parsers import IndexOfParser
+
+
+NEEDLES = ('he', 'she', 'his', 'hers', 'usher', 'x', '', 'shes', 'bár')
+
+
+@pytest.fixture(params=('python', 'c'))
+def backend(request):
+    if request.param == 'python':
+        with patch.object(automaton, 'ahocorasick', None):
+            yield
+    else:
+        if not automaton.ahocorasick:
+            pytest.skip('pyahocorasick is not installed')
+        yield
+
+
+@pytest.mark.parametrize('text', ('ushers', 'his bár', 'shes', '', 'nothing'))
+def test_search(backend, text):
+    assert automaton.Automaton(NEEDLES).search(text) == set(needle for needle in NEEDLES if needle in text)
+
+
+def test_parser(backend):
+    settings = dict(('has_%s' % i, needle) for i, needle in enumerate(NEEDLES))
+    parser = IndexOfParser(settings)
+    parser.automaton_threshold = 2
+    parsed = parser.parse('ushers')
+    assert parser.get_interface_class().automaton is not None
+    assert parsed.parse_all() == dict((name, needle in 'ushers') for name, needle in settings.items())
+    assert parsed.parse('sher')
+
+
+def test_threshold():
+    parser = IndexOfParser({'has_foo': 'foo'})
+    assert parser.get_interface_class().automaton is None
+    parser.automaton_threshold = 1
+    assert parser.get_interface_class().automaton is not None
+    assert parser.parse('foo').has_foo
@@ -0,0 +1,80 @@
+# coding: utf-8
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from .conftest import SimpleParser, SubParser, lxml_is_supported
+from pyanyapi.parsers import JSONParser, RegExpParser
+
+
+CONTENTS = ['%s.%s' % (i, i + 1) for i in range(50)]
+EXPECTED = [{'test': content, 'test2': content.split('.')[0], 'test3': None, 'test4': content.split('.')[0] + '_4'}
+            for content in CONTENTS]
+
+
+@pytest.mark.parametrize('executor', (None, 'thread', 'process'))
+@pytest.mark.parametrize('chunksize', (1, 7))
+def test_parse_all_many(executor, chunksize):
+    results = SimpleParser().parse_all_many(CONTENTS, executor=executor, workers=2, chunksize=chunksize)
+    assert list(results) == EXPECTED
+
+
+@pytest.mark.parametrize('executor', (None, 'thread', 'process'))
+def test_parse_only_many(executor):
+    results = SimpleParser().parse_only_many(iter(CONTENTS), iter(['test4', 'test']), executor=executor, workers=2)
+    assert list(results) == [dict((key, item[key]) for key in ('test4', 'test')) for item in EXPECTED]
+
+
+@pytest.mark.parametrize('executor', (None, 'thread'))
+def test_parse_many(executor):
+    results = SimpleParser(flags=re.DOTALL).parse_many(CONTENTS, executor=executor, workers=2)
+    assert [result.test for result in results] == CONTENTS
+
+
+@lxml_is_supported
+def test_parse_many_preloads():
+    content = "<html><body><a href='#test'>test</body></html>"
+    result = next(SubParser().parse_many([content], executor='thread'))
+    assert result.__dict__['_parsed_content'] is not None
+    assert result.href == '#test'
+
+
+def test_parse_many_combined():
+    parser = JSONParser({'test': 'container > test'}) & RegExpParser({'digits': r'\d+'})
+    results = parser.parse_many(['{"container": {"test": "value"}}', '123'], executor='thread')
+    assert [(result.test, result.digits) for result in results] == [('value', None), (None, '123')]
+
+
+def test_custom_executor():
+    with ThreadPoolExecutor(2) as executor:
+        assert list(SimpleParser().parse_all_many(CONTENTS, executor=executor)) == EXPECTED
+
+
+def test_process_pool_interfaces():
+    with pytest.raises(ValueError):
+        SimpleParser().parse_many(CONTENTS, executor='process')
+
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        list(SimpleParser().parse_all_many(CONTENTS, executor='unknown'))
+
+
+def test_bounded_in_flight():
+    consumed = []
+    lock = threading.Lock()
+
+    def contents():
+        for content in CONTENTS:
+            with lock:
+                consumed.append(content)
+            yield content
+
+    results = SimpleParser().parse_all_many(contents(), executor='thread', workers=2, chunksize=3)
+    assert next(results) == EXPECTED[0]
+    # 2 workers - at most 4 chunks are submitted before the first result is returned
+    assert len(consumed) <= 12
+    results.close()
+    assert len(consumed) <= 12
@@ -0,0 +1,67 @@
+# coding: utf-8
+import pickle
+
+import pytest
+
+from .conftest import SimpleParser, SubParser, lxml_is_supported
+from pyanyapi.parsers import CSVParser, HTMLParser, JSONParser, RegExpParser
+
+
+@pytest.fixture
+def parser():
+    parser = SimpleParser()
+    parser.compact = True
+    return parser
+
+
+def test_record(parser):
+    record = parser.parse_all('1.2')
+    assert isinstance(record, tuple)
+    assert record._asdict() == SimpleParser().parse_all('1.2')
+    assert record.test4 == record['test4'] == '1_4'
+    assert type(record) is type(parser.parse_all('3.4'))
+    assert not hasattr(record, '__dict__')
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_release(parser):
+    parsed = parser.parse('1.2')
+    parsed.parse_all()
+    assert parsed.content is None
+    assert 'parse' not in parsed.__dict__
+    # Computed attributes are still available
+    assert parsed.test2 == '1'
+
+
+def test_combined():
+    combined = JSONParser({'test': 'container > test'}) & RegExpParser({'digits': r'(\d+)'})
+    combined.compact = True
+    parsed = combined.parse('{"container": {"test": "12"}}')
+    assert parsed.parse_all()._asdict() == {'test': '12', 'digits': '12'}
+    assert all(interface.content is None for interface in parsed._interfaces.values())
+
+
+def test_csv():
+    parser = CSVParser({'value': '1:1'})
+    parser.compact = True
+    assert parser.parse_all('1,2\r\n3,4').value == '4'
+
+
+@lxml_is_supported
+def test_sub_parsers():
+    sub_parser = SubParser()
+    sub_parser.compact = True
+
+    class Parser(HTMLParser):
+        compact = True
+        settings = {'elem': {'base': './/a', 'parser': sub_parser}}
+
+    record = Parser().parse_all("<html><body><a href='#test'>test</a></body></html>")
+    assert record.elem[0].href == '#test'
+    assert record.elem[0]._asdict() == {'href': '#test', 'text': 'test'}
+
+
+@pytest.mark.parametrize('executor', (None, 'process'))
+def test_parse_all_many(parser, executor):
+    results = list(parser.parse_all_many(['1.2', '3.4'], executor=executor, workers=2))
+    assert [result.test for result in results] == ['1.2', '3.4']
@@ -0,0 +1,61 @@
+# coding: utf-8
+import pytest
+
+from pyanyapi.helpers import CacheStats, LazySequence, LRUCache, memoize
+
+
+def test_lru_eviction():
+    totals = CacheStats()
+    cache = LRUCache(2, totals)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache.get('a') == 1
+    cache['c'] = 3
+    assert 'b' not in cache
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (1, 1, 1)
+    assert (totals.hits, totals.misses, totals.evictions) == (1, 1, 1)
+
+
+def test_lru_disabled():
+    cache = LRUCache(0)
+    cache['a'] = 1
+    assert 'a' not in cache
+    assert len(cache) == 0
+
+
+def test_memoize():
+    calls = []
+
+    def func(key):
+        calls.append(key)
+        return key * 2
+
+    memoized = memoize(func, maxsize=1)
+    assert [memoized(1), memoized(1), memoized(2), memoized(1)] == [2, 2, 4, 2]
+    assert calls == [1, 2, 1]
+    assert memoized.cache.stats.evictions == 2
+    assert memoized.__wrapped__ is func
+
+
+def test_lazy_sequence():
+    calls = []
+
+    def factory(item):
+        calls.append(item)
+        return item * 2
+
+    sequence = LazySequence([1, 2, 3], factory)
+    assert len(sequence) == 3
+    assert calls == []
+    assert sequence[-1] == 6
+    assert sequence[2] == 6
+    assert calls == [3]
+    assert sequence[:2] == [2, 4]
+    assert list(sequence) == [2, 4, 6]
+    assert sequence == [2, 4, 6]
+    assert sequence != [2, 4]
+    assert calls == [3, 1, 2]
+    with pytest.raises(IndexError):
+        sequence[3]
@@ -0,0 +1,36 @@
+# coding: utf-8
+import subprocess
+import sys
+
+import pytest
+
+
+HEAVY_MODULES = ('lxml', 'yaml', 'csv', 'json', 'ujson', 'orjson', 'sqlite3')
+
+
+def get_loaded_modules(code):
+    script = '''
+import sys
+%s
+print(' '.join(name for name in %r if name in sys.modules))
+''' % (code, HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return set(output.decode('utf-8').split())
+
+
+def test_no_heavy_dependencies():
+    assert get_loaded_modules('''
+import pyanyapi
+from pyanyapi.parsers import RegExpParser
+from pyanyapi.resultcache import ResultCache
+assert RegExpParser({'test': 'a(.)'}).parse_all('ab') == {'test': 'b'}
+''') == set()
+
+
+@pytest.mark.parametrize('code, expected', (
+    ("JSONParser({'test': 'a'}, backend='json').parse('{}').test", {'json'}),
+    ("HTMLParser({'test': 'string(//p)'}).parse('<p>1</p>').test", {'lxml'}),
+    ("CSVParser({'test': '0:0'}).parse('1,2').test", {'csv'}),
+))
+def test_loaded_on_usage(code, expected):
+    assert get_loaded_modules('from pyanyapi.parsers import *\n' + code) == expected
@@ -0,0 +1,89 @@
+# coding: utf-8
+import logging
+
+from pyanyapi.decorators import interface_property
+from pyanyapi.instrumentation import Aggregator, LoggingSink, percentile
+from pyanyapi.parsers import JSONParser, RegExpParser
+
+
+class Parser(JSONParser):
+    settings = {'test': 'container > test', 'items': {'base': 'items', 'children': 'id'}}
+
+    @interface_property
+    def upper(self):
+        return self.test.upper()
+
+
+CONTENT = '{"container": {"test": "value"}, "items": [{"id": 1}, {"id": 2}]}'
+
+
+def test_events():
+    events = []
+    parser = Parser()
+    parser.instrumentation = lambda event, name, duration: events.append((event, name, duration))
+    parsed = parser.parse(CONTENT)
+    assert parsed.parse_all() == {'test': 'value', 'items': [1, 2], 'upper': 'VALUE'}
+    assert parsed.parse('container > test') == 'value'
+    names = [(event, name) for event, name, _ in events]
+    assert names[0] == ('prepare_content', 'Parser')
+    assert set(names) == {
+        ('prepare_content', 'Parser'),
+        ('perform_parsing', 'Parser'),
+        ('attribute', 'test'),
+        ('attribute', 'items'),
+        ('attribute', 'upper'),
+        ('expand_results', 'Parser'),
+        ('cache_miss', 'Parser'),
+    }
+    # Attributes are evaluated once
+    assert names.count(('attribute', 'test')) == 1
+    assert all(duration >= 0 for event, _, duration in events if not event.startswith('cache_'))
+    assert parser.cache_stats.misses == names.count(('cache_miss', 'Parser'))
+
+
+def test_disabled():
+    parser = Parser()
+    interface_class = parser.get_interface_class()
+    assert interface_class.perform_parsing is JSONParser.interface_class.perform_parsing
+    parser.instrumentation = Aggregator()
+    assert parser.get_interface_class() is not interface_class
+
+
+def test_aggregator():
+    aggregator = Aggregator()
+    parser = Parser()
+    parser.instrumentation = aggregator
+    for _ in range(10):
+        parsed = parser.parse(CONTENT)
+        parsed.parse_all()
+        parsed.parse('container')
+        parsed.parse('container')
+    summary = aggregator.summary()
+    assert summary[('attribute', 'test')]['count'] == 10
+    assert summary[('perform_parsing', 'Parser')]['p50'] <= summary[('perform_parsing', 'Parser')]['max']
+    assert aggregator.counters[('cache_hit', 'Parser')] == 10
+    assert aggregator.counters[('cache_miss', 'Parser')] == parser.cache_stats.misses
+    aggregator.reset()
+    assert aggregator.summary() == {}
+
+
+def test_regexp_attributes():
+    events = []
+    parser = RegExpParser({'first': r'\d+', 'second': r'[a-z]+'})
+    parser.instrumentation = lambda event, name, duration: events.append((event, name))
+    assert parser.parse_all('123 abc') == {'first': '123', 'second': 'abc'}
+    assert {('attribute', 'first'), ('attribute', 'second')} <= set(events)
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert [percentile(values, fraction) for fraction in (0, 0.5, 0.9, 0.99, 1)] == [1, 50, 90, 99, 100]
+
+
+def test_logging_sink(caplog):
+    parser = Parser()
+    parser.instrumentation = LoggingSink()
+    with caplog.at_level(logging.DEBUG, logger='pyanyapi'):
+        parser.parse(CONTENT).test
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith('attribute test ') for message in messages)
@@ -0,0 +1,68 @@
+# coding: utf-8
+from io import BytesIO
+
+import pytest
+
+from .conftest import lxml_is_supported
+from pyanyapi.exceptions import ResponseParseError
+from pyanyapi.parsers import XMLParser
+
+
+pytestmark = lxml_is_supported
+
+FEED = b'''<?xml version="1.0" encoding="UTF-8"?>
+<feed>
+<header><id>feed-id</id></header>
+<record><id>1</id><name> first </name><tags><tag>a</tag><tag>b</tag></tags></record>
+<record><id>2</id><name>second</name><tags/></record>
+<record><id>3</id><name>third</name><tags><tag>c</tag></tags></record>
+</feed>'''
+SETTINGS = {
+    'id': 'string(//id)',
+    'relative_id': 'string(id)',
+    'name': 'string(./name)',
+    'tags': {'base': '//tag', 'children': 'text()'},
+    'count': 'count(/record/tags/tag)',
+}
+EXPECTED = [
+    {'id': '1', 'relative_id': '1', 'name': ' first ', 'tags': ['a', 'b'], 'count': 2.0},
+    {'id': '2', 'relative_id': '2', 'name': 'second', 'tags': [], 'count': 0.0},
+    {'id': '3', 'relative_id': '3', 'name': 'third', 'tags': ['c'], 'count': 1.0},
+]
+
+
+@pytest.mark.parametrize('convert', (lambda feed: feed, BytesIO))
+def test_iterparse(convert):
+    results = XMLParser(SETTINGS).iterparse(convert(FEED), 'record')
+    assert next(results) == EXPECTED[0]
+    assert list(results) == EXPECTED[1:]
+
+
+def test_iterparse_file(tmpdir):
+    path = tmpdir.join('feed.xml')
+    path.write_binary(FEED)
+    assert list(XMLParser(SETTINGS, strip=True).iterparse(str(path), 'record'))[0]['name'] == 'first'
+
+
+def test_iterparse_same_as_fragments():
+    parser = XMLParser(SETTINGS)
+    fragments = [
+        b'<record><id>1</id><name> first </name><tags><tag>a</tag><tag>b</tag></tags></record>',
+        b'<record><id>2</id><name>second</name><tags/></record>',
+    ]
+    assert [parser.parse_all(fragment) for fragment in fragments] == EXPECTED[:2]
+
+
+def test_iterparse_clears_records():
+    parser = XMLParser({'id': 'string(id)', 'previous': 'count(preceding::*)'})
+    content = b'<feed>' + b''.join(b'<record><id>%d</id></record>' % i for i in range(100)) + b'</feed>'
+    for i, result in enumerate(parser.iterparse(content, 'record')):
+        assert result['id'] == str(i)
+        assert result['previous'] == 0
+
+
+def test_iterparse_error():
+    records = XMLParser(SETTINGS).iterparse(b'<feed><record><id>1</id></record><record>', 'record')
+    assert next(records)['id'] == '1'
+    with pytest.raises(ResponseParseError):
+        next(records)
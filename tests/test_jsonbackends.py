@@ -0,0 +1,128 @@
+# coding: utf-8
+import json
+import math
+
+import pytest
+
+from pyanyapi import jsonbackends
+from pyanyapi.exceptions import ResponseParseError
+from pyanyapi.parsers import AJAXParser, JSONParser
+
+
+CONTENT = '{"container": {"test": "value", "items": [1, 2]}}'
+SETTINGS = {'test': 'container > test', 'second': 'container > items > 1'}
+EXPECTED = {'test': 'value', 'second': 2}
+
+
+@pytest.fixture(autouse=True)
+def default_backend():
+    yield
+    jsonbackends.set_default_backend(None)
+
+
+@pytest.fixture(params=('json', 'ujson', 'orjson'))
+def backend(request):
+    if request.param not in jsonbackends.BACKENDS:
+        pytest.skip('%s is not installed' % request.param)
+    return request.param
+
+
+@pytest.mark.parametrize('content', (
+    CONTENT,
+    CONTENT.encode('utf-8'),
+    bytearray(CONTENT.encode('utf-8')),
+    memoryview(CONTENT.encode('utf-8')),
+))
+def test_content_types(backend, content):
+    assert JSONParser(SETTINGS, backend=backend).parse_all(content) == EXPECTED
+
+
+def test_non_ascii_bytes(backend):
+    assert JSONParser({'test': 'test'}, backend=backend).parse(u'{"test": "bár"}'.encode('utf-8')).test == u'bár'
+
+
+@pytest.mark.parametrize('content', ('{"container": }', b'\xff\xfe', ''))
+def test_invalid_content(backend, content):
+    with pytest.raises(ResponseParseError):
+        JSONParser(SETTINGS, backend=backend).parse(content).test
+
+
+def test_streaming(backend):
+    # Escaped keys are decoded with backend
+    parser = JSONParser({'test': 'container > test'}, streaming=True, backend=backend)
+    assert parser.parse('{"container": {"te\\u0073t": 1}}').test == 1
+
+
+def test_custom_decoder():
+    calls = []
+
+    def loads(content):
+        calls.append(content)
+        return json.loads(content)
+
+    assert JSONParser(SETTINGS, backend=loads).parse_all(CONTENT.encode('utf-8')) == EXPECTED
+    # Decoder without declared input types receives text
+    assert calls == [CONTENT]
+
+
+def test_registered_decoder():
+    backend = jsonbackends.register_backend('custom', lambda content: {'container': {'test': content}})
+    try:
+        assert JSONParser(SETTINGS, backend='custom').parse('raw').test == 'raw'
+        assert jsonbackends.get_backend('custom') is backend
+    finally:
+        del jsonbackends.BACKENDS['custom']
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        JSONParser(SETTINGS, backend='unknown')
+    with pytest.raises(TypeError):
+        jsonbackends.get_backend(1)
+
+
+def test_detect_backend():
+    expected = [name for name in jsonbackends.PREFERENCE if name in jsonbackends.BACKENDS][0]
+    assert jsonbackends.get_backend().name == expected
+
+
+def test_detected_backend_fallback(monkeypatch):
+
+    def loads(content):
+        if 'NaN' in content:
+            raise ValueError('NaN is not supported')
+        return json.loads(content)
+
+    monkeypatch.setitem(jsonbackends.BACKENDS, 'strict', jsonbackends.JSONBackend('strict', loads))
+    monkeypatch.setattr(jsonbackends, 'PREFERENCE', ['strict'] + jsonbackends.PREFERENCE)
+    assert jsonbackends.get_backend().name == 'strict'
+    assert math.isnan(JSONParser({'a': 'a'}).parse('{"a": NaN}').a)
+    with pytest.raises(ResponseParseError):
+        JSONParser({'a': 'a'}).parse('{"a": }').a
+    # Explicitly chosen backend is used as is
+    with pytest.raises(ResponseParseError):
+        JSONParser({'a': 'a'}, backend='strict').parse('{"a": NaN}').a
+
+
+def test_default_backend():
+    calls = []
+    parser = JSONParser(SETTINGS)
+    jsonbackends.set_default_backend(lambda content: calls.append(content) or json.loads(content))
+    assert parser.parse_all(CONTENT) == EXPECTED
+    assert calls == [CONTENT]
+    # Parser's own backend takes precedence
+    assert JSONParser(SETTINGS, backend='json').parse_all(CONTENT) == EXPECTED
+    assert len(calls) == 1
+
+
+def test_backend_change():
+    parser = JSONParser(SETTINGS, backend='json')
+    interface_class = parser.get_interface_class()
+    parser.json_backend = lambda content: {'container': {'test': 'custom'}}
+    assert parser.get_interface_class() is not interface_class
+    assert parser.parse(CONTENT).test == 'custom'
+
+
+def test_ajax(backend):
+    parser = AJAXParser({'p': 'content > string(//p)'}, backend=backend)
+    assert parser.parse(b'{"content": "<p>text</p>"}').p == 'text'
@@ -0,0 +1,114 @@
+# coding: utf-8
+import io
+import json
+
+import pytest
+
+from .conftest import DICT_DOCUMENTS, DICT_SETTINGS
+from pyanyapi.exceptions import ResponseParseError
+from pyanyapi.jsonstream import StreamResolver
+from pyanyapi.parsers import JSONParser
+
+
+@pytest.mark.parametrize('document', DICT_DOCUMENTS)
+@pytest.mark.parametrize('chunk_size', (1, 3, 65536))
+@pytest.mark.parametrize('convert', (lambda text: text, lambda text: text.encode('utf8'), io.StringIO))
+def test_same_results(document, chunk_size, convert):
+    content = json.dumps(document, indent=1)
+    parser = JSONParser(DICT_SETTINGS, streaming=True)
+    parsed = parser.parse(convert(content))
+    parsed.chunk_size = chunk_size
+    assert parsed.parse_all() == JSONParser(DICT_SETTINGS).parse_all(content)
+
+
+@pytest.mark.parametrize('chunk_size', (1, 2, 3, 4, 5))
+def test_numbers_split_by_chunks(chunk_size):
+    content = '{"a": [-2.5, 1e10, 3.25E-2, 0, -0.5e+3, 12], "b": {"c": 1.5}, "d": -20.125}'
+    settings = {'a': 'a', 'first': 'a > 0', 'c': 'b > c', 'd': 'd'}
+    parsed = JSONParser(settings, streaming=True).parse(content)
+    parsed.chunk_size = chunk_size
+    assert parsed.parse_all() == JSONParser(settings).parse_all(content)
+
+
+LONG_STRING = 'long \\ "text" ü ' * 2000
+LONG_KEY = 'key' * 10000
+LONG_STRINGS_DOCUMENT = {
+    'skipped': LONG_STRING,
+    'nested': [{'skipped': LONG_STRING}, LONG_STRING],
+    LONG_KEY: 'key',
+    'read': LONG_STRING,
+    'id': 1,
+}
+
+
+@pytest.mark.parametrize('chunk_size', (1, 7, 100))
+def test_strings_split_by_chunks(monkeypatch, chunk_size):
+    sizes = []
+    fill = StreamResolver.fill
+
+    def tracking_fill(self):
+        sizes.append(len(self.buffer))
+        return fill(self)
+
+    monkeypatch.setattr(StreamResolver, 'fill', tracking_fill)
+    content = io.BytesIO(json.dumps(LONG_STRINGS_DOCUMENT).encode('utf8'))
+    settings = {'id': 'id', 'key': LONG_KEY, 'read': 'read'}
+    parsed = JSONParser(settings, streaming=True).parse(content)
+    parsed.chunk_size = chunk_size
+    assert parsed.parse_all() == {'id': 1, 'key': 'key', 'read': LONG_STRING}
+    # Already scanned parts of strings are not kept in buffer
+    assert max(sizes) <= 2 * chunk_size
+
+
+def test_strip():
+    content = json.dumps(DICT_DOCUMENTS[0])
+    parser = JSONParser(DICT_SETTINGS, strip=True, streaming=True)
+    assert parser.parse(content).escaped == 'ü'
+    assert parser.parse_all(content) == JSONParser(DICT_SETTINGS, strip=True).parse_all(content)
+
+
+def test_memoryview():
+    content = json.dumps(DICT_DOCUMENTS[0]).encode('utf8')
+    assert JSONParser(DICT_SETTINGS, streaming=True).parse(memoryview(content)).simple == 'value'
+
+
+class TrackingFile(io.BytesIO):
+    """
+    Counts data, which was read from it.
+    """
+    def __init__(self, *args, **kwargs):
+        super(TrackingFile, self).__init__(*args, **kwargs)
+        self.read_size = 0
+
+    def read(self, size=-1):
+        data = super(TrackingFile, self).read(size)
+        self.read_size += len(data)
+        return data
+
+
+def test_stops_reading():
+    content = b'{"container": {"test": "value", "other": 1}, "tail": [' + b'1, ' * 100000 + b'1]}'
+    source = TrackingFile(content)
+    parser = JSONParser({'test': 'container > test', 'other': 'container > other'}, streaming=True)
+    parsed = parser.parse(source)
+    assert parsed.parse_all() == {'test': 'value', 'other': 1}
+    assert source.read_size == parsed.chunk_size
+
+
+def test_skips_invalid_subtrees():
+    parser = JSONParser({'test': 'container > test'}, streaming=True)
+    assert parser.parse('{"skipped": {"not": json}, "container": {"test": "value"}}').test == 'value'
+
+
+@pytest.mark.parametrize('content', ('', '{"container": {"test": ', '{"container" 1}', '[1 2]', 123))
+def test_parsing_error(content):
+    parsed = JSONParser({'test': 'container > test'}, streaming=True).parse(content)
+    with pytest.raises(ResponseParseError):
+        parsed.test
+
+
+def test_undeclared_query():
+    parsed = JSONParser({'test': 'container > test'}, streaming=True).parse('{"container": {"test": "value"}}')
+    assert parsed.parse('container > test') == 'value'
+    with pytest.raises(ValueError):
+        parsed.parse('container')
@@ -1,11 +1,17 @@
 # coding: utf-8
+import json
 import re
 
 import pytest
 
 from ._compat import patch
-from .conftest import ChildParser, SubParser, SimpleParser, lxml_is_supported, lxml_is_not_supported
+from .conftest import (
+    DICT_DOCUMENTS, DICT_SETTINGS, ChildParser, SubParser, SimpleParser, lxml_is_supported, lxml_is_not_supported
+)
+from pyanyapi._compat import etree
+from pyanyapi.decorators import interface_property
 from pyanyapi.exceptions import ResponseParseError
+from pyanyapi.interfaces import expand_results
 from pyanyapi.parsers import (
     XMLObjectifyParser,
     XMLParser,
@@ -211,6 +217,34 @@ def test_json_value_error_parse():
     assert JSONParser({'test': 'container > test'}).parse('{"container":"1"}').test is None
 
 
+def test_json_fan_out():
+    content = json.dumps({
+        'items': [
+            {'id': 1, 'tags': ['a', ' b ']},
+            {'id': 0, 'tags': []},
+            {'tags': ['c']},
+            {'id': None, 'tags': [' d']},
+        ],
+        'groups': {'first': {'id': 'x'}, 'second': {'id': 'y'}},
+    })
+    parser = JSONParser({
+        'ids': 'items > * > id',
+        'tags': 'items > 0:2 > tags > *',
+        'reversed': 'items > ::-3 > tags > 0',
+        'groups': 'groups > * > id',
+        'missing': 'missing > * > id',
+        'last': 'items > -1 > tags > *',
+    }, strip=True)
+    assert parser.parse_all(content) == {
+        'ids': [1, 0, None],
+        'tags': ['a', 'b'],
+        'reversed': ['d', 'a'],
+        'groups': ['x', 'y'],
+        'missing': [],
+        'last': ['d'],
+    }
+
+
 def test_regexp_parse():
     assert RegExpParser({'digits': '\d+'}).parse('123abc').parse('[a-z]+') == 'abc'
 
@@ -251,6 +285,44 @@ def test_ajax_parser_cache():
         assert len(parsed._inner_cache) == 2
 
 
+@pytest.mark.parametrize('cache_size, expected_calls', ((None, 1), (0, 3)))
+def test_parse_cache_size(cache_size, expected_calls):
+    parser = JSONParser()
+    parser.cache_size = cache_size
+    calls = []
+    interface_class = parser.get_interface_class()
+    original = interface_class.parse
+    with patch.object(interface_class, 'parse', lambda self, query: calls.append(query) or original(self, query)):
+        parsed = parser.parse(JSON_CONTENT)
+        for _ in range(3):
+            assert parsed.parse('container > test') == 'value'
+    assert len(calls) == expected_calls
+    assert parser.cache_stats.misses == (1 if cache_size is None else 3)
+
+
+def test_parse_cache_eviction():
+    parser = JSONParser()
+    parser.cache_size = 1
+    parsed = parser.parse(JSON_CONTENT)
+    assert parsed.parse('container > test') == 'value'
+    assert parsed.parse('another') == '123'
+    assert parsed.parse('container > test') == 'value'
+    assert len(parsed.parse.cache) == 1
+    stats = parser.cache_stats
+    assert (stats.hits, stats.misses, stats.evictions) == (0, 3, 2)
+
+
+@lxml_is_supported
+def test_ajax_parser_cache_size():
+    parser = AJAXParser({'p': 'content > string(//p)', 'second': 'second_part > string(//p)'})
+    parser.cache_size = 1
+    parsed = parser.parse(AJAX_CONTENT)
+    assert parsed.p == 'Pcontent'
+    assert parsed.second == 'second_p'
+    assert list(parsed._inner_cache.data) == ['second_part']
+    assert parsed._inner_cache['second_part'].parse.cache.maxsize == 1
+
+
 @lxml_is_supported
 def test_ajax_parser_invalid_settings():
     parsed = AJAXParser({
@@ -295,6 +367,7 @@ def test_parse_csv():
     assert api.second == '6'
     assert api.parse('0:1') == '2'
     assert api.parse('0:6') is None
+    assert api.parse('1: 2') == '6'
 
 
 def test_parse_csv_custom_delimiter():
@@ -329,6 +402,131 @@ def test_children(sub_parser):
     assert api.parse_all() == {'elem': [{'href': '#test', 'text': 'test'}]}
 
 
+@lxml_is_supported
+def test_children_without_serialization():
+    content = '<ul><li><a href="#1">first</a><b>1</b></li><li><a href="#2">second</a></li></ul>'
+
+    class ItemParser(HTMLParser):
+        settings = {
+            'href': 'string(//a/@href)',
+            'text': 'string(//a)',
+            'count': 'count(/html/body/li/*)',
+        }
+
+    class Parser(HTMLParser):
+        settings = {
+            'items': {'base': '//li', 'parser': ItemParser},
+            'raw': {'base': '//li', 'parser': IndexOfParser({'has_bold': '<b>'})},
+        }
+
+    with patch('pyanyapi.interfaces.etree.tostring', wraps=etree.tostring) as tostring:
+        api = Parser().parse(content)
+        assert expand_results(api.items) == [
+            {'href': '#1', 'text': 'first', 'count': 2.0},
+            {'href': '#2', 'text': 'second', 'count': 1.0},
+        ]
+        assert not tostring.called
+        # Other sub-parsers get serialized elements
+        assert expand_results(api.raw) == [{'has_bold': True}, {'has_bold': False}]
+        assert tostring.call_count == 2
+
+
+SUB_PARSER_SETTINGS = {
+    'id': '/html/body/div/@id',
+    'root': 'name(/*)',
+    'relative': 'a/text()',
+    'ancestor': 'count(ancestor::body)',
+    'preceding': 'count(preceding::a)',
+    'descendant': '//a/text()',
+    'title': 'string(/html/head/title)',
+    'item': 'string(/item/@id)',
+    'parent': 'count(/item/..)',
+    'tail': 'string(/html/body)',
+}
+
+
+@lxml_is_supported
+@pytest.mark.parametrize('parser_class, content, base', (
+    (HTMLParser, '<html><body><a>0</a><div id="x"><a>1</a></div>tail</body></html>', '//div'),
+    (HTMLParser, '<html><head><title>t</title></head><body><a>0</a></body></html>', '//title'),
+    (HTMLParser, '<html><body><a>0</a></body></html>', '//body'),
+    (HTMLParser, '<html><body><a>0</a></body></html>', '/html'),
+    (XMLParser, '<feed><a>0</a><item id="1"><a>1</a></item>tail</feed>', '//item'),
+))
+def test_children_same_as_serialized(parser_class, content, base):
+    # Sub-parsers get the same document, as serialized elements would give
+    sub_parser = parser_class(SUB_PARSER_SETTINGS)
+    for element in parser_class({'elements': base}).parse(content).elements:
+        detached = sub_parser.from_parsed(sub_parser.interface_class.detach_element(element))
+        # Tail text breaks XML documents
+        serialized = etree.tostring(element, with_tail=parser_class is HTMLParser)
+        assert detached.parse_all() == sub_parser.parse(serialized).parse_all()
+
+
+@lxml_is_supported
+def test_children_are_lazy():
+    content = '<ul>%s</ul>' % ''.join('<li><a href="#%s">%s</a></li>' % (i, i) for i in range(5))
+    sub_parser = SubParser()
+
+    class Parser(HTMLParser):
+        settings = {'items': {'base': '//li', 'parser': sub_parser}}
+
+    with patch.object(sub_parser, 'from_parsed', wraps=sub_parser.from_parsed) as from_parsed:
+        items = Parser().parse(content).items
+        assert len(items) == 5
+        assert not from_parsed.called
+        assert items[1].href == '#1'
+        assert items[1] is items[1]
+        assert from_parsed.call_count == 1
+        assert [item.text for item in items[:3]] == ['0', '1', '2']
+        assert from_parsed.call_count == 3
+
+
+def test_iter_all():
+    parser = RegExpParser({'first': r'(\d+)', 'second': r'(\w+)'})
+    items = parser.iter_all('abc 123')
+    assert next(items) in (('first', '123'), ('second', 'abc'))
+    assert dict(parser.iter_all('abc 123')) == parser.parse_all('abc 123') == {'first': '123', 'second': 'abc'}
+
+
+def test_parse_only():
+    calls = []
+
+    class Parser(RegExpParser):
+        settings = {'first': r'(\d+)', 'second': r'(\w+)'}
+
+        @interface_property
+        def combined(self):
+            calls.append('combined')
+            return self.first + '!'
+
+    parser = Parser()
+    api = parser.parse('abc 123')
+    assert api.parse_only(['combined']) == {'combined': '123!'}
+    # Only requested attributes and their dependencies are evaluated
+    assert 'first' in api.__dict__
+    assert 'second' not in api.__dict__
+    assert calls == ['combined']
+    assert parser.parse_only('abc 123', ['second']) == {'second': 'abc'}
+    assert parser.parse_only('abc 123', []) == {}
+
+
+def test_parse_only_combined(dummy_parser):
+    assert dummy_parser.parse_only(JSON_CONTENT, ('success', 'combined')) == {'success': 'value', 'combined': '123-value'}
+
+
+def test_property_names(dummy_parser):
+    interface_class = dummy_parser.parsers[0].get_interface_class()
+    assert interface_class.property_names == ('success', )
+    assert dummy_parser.get_interface_class().property_names == ('combined', )
+
+
+def test_iter_all_combined(dummy_parser):
+    items = dummy_parser.parse(JSON_CONTENT).iter_all()
+    assert next(items) == ('combined', '123-value')
+    assert dict(items) == {'success': 'value', 'test': None}
+
+
 class BrokenObject(object):
 
     def __str__(self):
@@ -352,3 +550,295 @@ class TestIndexOfParser:
         parsed = self.parser.parse(BrokenObject())
         with pytest.raises(ResponseParseError):
             getattr(parsed, attr)
+
+
+def test_interface_class_reuse():
+    parser = JSONParser({'test': 'container > test'})
+    first = parser.parse(JSON_CONTENT)
+    second = parser.parse(JSON_CONTENT)
+    assert type(first) is type(second)
+    assert second.test == 'value'
+
+
+@pytest.mark.parametrize('change, attr', (
+    (lambda settings: settings.update({'test': 'another'}), 'test'),
+    (lambda settings: settings.update({'new': 'another'}), 'new'),
+    (lambda settings: settings['complex'].update({'base': 'another'}), 'complex'),
+))
+def test_interface_class_rebuild(change, attr):
+    parser = JSONParser({'test': 'container > test', 'complex': {'base': 'container > test'}})
+    interface_class = type(parser.parse(JSON_CONTENT))
+    change(parser.settings)
+    parsed = parser.parse(JSON_CONTENT)
+    assert type(parsed) is not interface_class
+    assert getattr(parsed, attr) == '123'
+    assert type(parser.parse(JSON_CONTENT)) is type(parsed)
+
+
+@pytest.mark.parametrize('parser_class, settings, exception', (
+    pytest.param(HTMLParser, {'test': '//p['}, SyntaxError, marks=lxml_is_supported),
+    pytest.param(AJAXParser, {'test': 'string(//p)'}, ValueError, marks=lxml_is_supported),
+    (RegExpParser, {'test': '(\\d+'}, re.error),
+    (CSVParser, {'test': 'first:1'}, ValueError),
+    (CSVParser, {'test': '1'}, ValueError),
+))
+def test_malformed_settings(parser_class, settings, exception):
+    with pytest.raises(exception):
+        parser_class(settings)
+
+
+@lxml_is_supported
+def test_precompiled_xpath():
+    from lxml import etree
+
+    parsed = XMLParser({'test': etree.XPath('string(//id/text())')}).parse(XML_CONTENT)
+    assert parsed.test == '32e9a4a2'
+
+
+def test_precompiled_regexp():
+    assert RegExpParser({'test': re.compile('\\d+.\\d+', re.DOTALL)}).parse(MULTILINE_CONTENT).test == '123\n234'
+
+
+def test_regexp_bytes():
+    parser = RegExpParser({'test': b'(\\d+)'})
+    assert parser.parse(b'ab12').test == b'12'
+    assert parser.parse(b'ab12').parse(b'[a-z]+') == b'ab'
+    assert parser.parse_all(b'ab12') == {'test': b'12'}
+
+
+@pytest.mark.parametrize('single_pass', (True, False))
+def test_regexp_bytes_optional_groups(single_pass):
+    settings = {'optional': b'a(b|c)?', 'groups': b'(a)(x)?'}
+    parser = RegExpParser(settings)
+    parser.single_pass = single_pass
+    assert parser.parse_all(b'ad') == dict(
+        (name, re.findall(pattern, b'ad')[0]) for name, pattern in settings.items()
+    ) == {'optional': b'', 'groups': (b'a', b'')}
+
+
+def test_regexp_flags_change():
+    parser = RegExpParser({'test': '\\d+.\\d+'})
+    assert parser.parse(MULTILINE_CONTENT).test == '123'
+    parser.flags = re.DOTALL
+    assert parser.parse(MULTILINE_CONTENT).test == '123\n234'
+
+
+REGEXP_SETTINGS = {
+    'first': r'id=(\d+)',
+    'overlapping': r'\d+',
+    'groups': r'(\w+)=(\d+)?',
+    'missing': r'missing',
+    'reference': r'(\w)\1',
+    'named': r'(?P<value>z+)',
+    'line': r'^\w+$',
+    'optional': r'a(b|c)?',
+}
+REGEXP_CONTENT = 'id=10 a= id=11 bb\nword\nzz'
+
+
+@pytest.mark.parametrize('single_pass', (True, False))
+def test_regexp_parse_all_matches_findall(single_pass):
+    parser = RegExpParser(REGEXP_SETTINGS, flags=re.MULTILINE)
+    parser.single_pass = single_pass
+    expected = dict(
+        (name, (re.findall(pattern, REGEXP_CONTENT, re.MULTILINE) or [None])[0])
+        for name, pattern in REGEXP_SETTINGS.items()
+    )
+    assert parser.parse_all(REGEXP_CONTENT) == expected
+    assert (parser.get_interface_class().scanner is not None) is single_pass
+
+
+def test_regexp_single_pass_varying_order():
+    settings = dict(('alpha%s' % index, r'alpha%s=(\w+)' % index) for index in range(10))
+    parser = RegExpParser(settings)
+    parser.cache_size = 0
+    assert len(parser.get_interface_class().scanner.groups) == 1
+    contents = []
+    for shift in range(10):
+        indexes = list(range(10))[shift:] + list(range(10))[:shift]
+        contents.append(' '.join('alpha%s=%s' % (index, shift) for index in indexes))
+    for shift, content in enumerate(contents):
+        assert parser.parse_all(content) == dict((name, str(shift)) for name in settings)
+    # Alternations are compiled once per scanner, not per document
+    with patch('re.compile', wraps=re.compile) as compile_mock:
+        for content in contents:
+            parser.parse_all(content)
+    assert not compile_mock.called
+
+
+def test_regexp_single_pass_verbose():
+    parser = RegExpParser({'a': r'\d+ # digits', 'b': 'x+'}, flags=re.VERBOSE)
+    assert parser.parse_all('ab 12 xx') == {'a': '12', 'b': 'xx'}
+    assert parser.parse('ab 12 xx').a == '12'
+
+
+def test_regexp_single_pass_keeps_accessed_values():
+    parsed = RegExpParser({'test': r'\d+', 'other': r'[a-z]+'}, strip=True).parse(' abc 12 ')
+    parsed.__dict__['test'] = 'cached'
+    assert parsed.parse_all() == {'test': 'cached', 'other': 'abc'}
+
+
+@pytest.mark.parametrize('document', DICT_DOCUMENTS)
+def test_dict_single_traversal(document):
+    content = json.dumps(document)
+    parser = JSONParser(DICT_SETTINGS, strip=True)
+    assert parser.get_interface_class().trie is not None
+    parsed = parser.parse(content)
+    expected = dict((name, getattr(parser.parse(content), name)) for name in DICT_SETTINGS)
+    assert parsed.parse_all() == expected
+    parser.single_pass = False
+    assert parser.get_interface_class().trie is None
+    assert parser.parse_all(content) == expected
+
+
+def test_dict_single_traversal_overridden_settings():
+
+    class Parser(YAMLParser):
+        settings = {'test': 'container > test', 'other': 'container > other'}
+
+        @interface_property
+        def test(self):
+            return 'overridden'
+
+    assert Parser().parse_all('container: {test: value, other: 1}') == {'test': 'overridden', 'other': 1}
+
+
+XPATH_SHARED_CONTENT = """
+<html><body>
+<div class="product"><h2> First </h2><span>1</span><span>2</span><a href="/1">link</a></div>
+<div class="product"><h2>Second</h2><div class="product"><span>nested</span></div><span>3</span></div>
+<p><span>other</span></p>
+</body></html>
+"""
+XPATH_SHARED_SETTINGS = {
+    'names': {'base': "//div[@class='product']", 'children': 'h2/text()'},
+    'spans': {'base': "//div[@class='product']", 'children': 'span/text()'},
+    'products': "//div[@class='product']",
+    'product_spans': "//div[@class='product']/span/text()",
+    'links': "//div[@class='product']//a/@href",
+    'first_span': "//div[@class='product']/span[1]",
+    'union': "//div[@class='product'] | //p",
+    'union_spans': "//div[@class='product'] | //p/span",
+    'following': "//div[@class='product']/following::span",
+    'body': '/html/body',
+    'body_spans': '/html/body/div/span',
+    'all_spans': "//div[@class='product']/span",
+    'first_spans': "//div[@class='product']/span[1]/text()",
+}
+
+
+@lxml_is_supported
+@pytest.mark.parametrize('content', (
+    XPATH_SHARED_CONTENT,
+    XPATH_SHARED_CONTENT.replace('<div class="product"><span>nested</span></div>', ''),
+))
+def test_xpath_shared_queries(content):
+    parser = HTMLParser(XPATH_SHARED_SETTINGS, strip=True)
+    parser.cache_size = 0
+    compiled = parser.get_interface_class().compiled_settings
+    assert compiled['names']['base'].shared and compiled['products'].shared
+    assert compiled['product_spans'].prefix.path == "//div[@class='product']/span"
+    assert compiled['body_spans'].prefix.path == '/html/body'
+    assert compiled['union_spans'].prefix is None
+    assert compiled['following'].prefix is None
+    assert compiled['body'].prefix is None
+    # Predicate belongs to the last step of `all_spans` expression, so it is not a prefix
+    assert compiled['first_spans'].prefix.path == "//div[@class='product']/span[1]"
+
+    def normalize(values):
+        # Elements of different documents are compared by their paths
+        return [
+            value.getroottree().getpath(value) if isinstance(value, etree._Element) else value for value in values
+        ]
+
+    parsed = parser.parse(content)
+    assert dict((name, normalize(value)) for name, value in parsed.parse_all().items()) == dict(
+        (name, normalize(getattr(HTMLParser({name: settings}, strip=True).parse(content), name)))
+        for name, settings in XPATH_SHARED_SETTINGS.items()
+    )
+    assert [element.tag for element in parsed.products] == ['div'] * content.count('class="product"')
+
+
+@lxml_is_supported
+def test_xpath_shared_queries_predicate_after_prefix():
+    parser = HTMLParser({'a': '//div/p', 'x': '//div/p[1]/text()'})
+    assert parser.parse('<div><p>a</p><p>b</p></div><div><p>c</p><p>d</p></div>').x == ['a', 'c']
+
+
+@lxml_is_supported
+def test_xpath_shared_queries_evaluated_once():
+    parser = HTMLParser(XPATH_SHARED_SETTINGS)
+    parser.cache_size = 0
+    interface_class = parser.get_interface_class()
+    with patch.object(interface_class, 'evaluate_query', wraps=interface_class.evaluate_query, autospec=True) as mock:
+        parser.parse_all(XPATH_SHARED_CONTENT)
+    paths = [call[0][1].path for call in mock.call_args_list]
+    assert paths.count("//div[@class='product']") == 1
+    assert paths.count('/html/body') == 1
+
+
+def test_regexp_single_pass_overridden_settings():
+
+    class Parser(RegExpParser):
+        settings = {'a': r'\d+', 'b': r'[a-z]+'}
+
+        @interface_property
+        def a(self):
+            return 'override'
+
+    assert Parser().parse_all('123 abc') == {'a': 'override', 'b': 'abc'}
+
+
+def test_combined_parser_parses_once(dummy_parser):
+    patchers = [patch.object(parser, 'parse', wraps=parser.parse) for parser in dummy_parser.parsers]
+    mocks = [patcher.start() for patcher in patchers]
+    try:
+        parsed = dummy_parser.parse(JSON_CONTENT)
+        assert parsed.success == 'value'
+        assert parsed.combined == '123-value'
+        assert parsed.test is None
+        assert parsed.parse_all() == {'success': 'value', 'combined': '123-value', 'test': None}
+        assert [mock.call_count for mock in mocks] == [1, 1]
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+
+def test_combined_parser_attributes_index():
+    first, second = JSONParser({'test': 'container > test'}), JSONParser({'test': 'another', 'other': 'another'})
+    parser = first & second
+    assert parser.get_attributes_index() == {'test': [first, second], 'other': [second]}
+    assert parser.get_attributes_index() is parser.get_attributes_index()
+    second.settings['new'] = 'another'
+    assert parser.get_attributes_index()['new'] == [second]
+    assert parser.parse(JSON_CONTENT).new == '123'
+
+
+CSV_WITH_HEADER = 'name,price,"quoted, field"\r\n\r\nfoo,10,"with spaces"\r\nbar,20,"multi\r\nline"\r\n'
+
+
+def test_parse_csv_header_names():
+    api = CSVParser({'price': '1:price', 'quoted': '2:quoted, field', 'missing': '1:missing'}).parse(CSV_WITH_HEADER)
+    assert api.price == '10'
+    assert api.quoted == 'multi\r\nline'
+    assert api.missing is None
+    assert api.parse('2:name') == 'bar'
+    assert api.parse('-1:price') == '20'
+    assert api.parse('1:2') == 'with spaces'
+
+
+def test_parse_csv_file():
+    from io import StringIO
+
+    assert CSVParser({'price': '2:price'}).parse(StringIO(CSV_WITH_HEADER, newline='')).price == '20'
+
+
+def test_parse_csv_reads_required_rows():
+    lines = iter(CSV_WITH_HEADER.splitlines(True) + [None])
+    api = CSVParser({'price': '1:price'}).parse(lines)
+    assert api.price == '10'
+    assert api.parsed_content == [['name', 'price', 'quoted, field'], ['foo', '10', 'with spaces']]
+    assert api.parse('2:0') == 'bar'
+    assert len(api.parsed_content) == 3
+    with pytest.raises(ResponseParseError):
+        api.parse('3:0')
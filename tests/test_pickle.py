@@ -0,0 +1,143 @@
+# coding: utf-8
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from .conftest import EmptyValuesParser, SimpleParser, lxml_is_supported
+from pyanyapi.decorators import interface_property
+from pyanyapi.interfaces import JSONInterface
+from pyanyapi.parsers import HTMLParser, JSONParser, RegExpParser, XMLParser, restore_parser
+
+
+def get_interface_class_id(parser):
+    return id(parser.get_interface_class())
+
+
+def test_parser():
+    parser = SimpleParser()
+    parser.get_interface_class()
+    restored = pickle.loads(pickle.dumps(parser))
+    assert restored is not parser
+    assert restored.__dict__.get('_interface_cache') is None
+    assert restored.parse_all('1.2') == parser.parse_all('1.2')
+    # Copies within the same process are independent
+    assert pickle.loads(pickle.dumps(parser)) is not restored
+
+
+def test_parser_is_restored_once_per_process():
+    parser = SimpleParser()
+    with ProcessPoolExecutor(1) as pool:
+        first = set(pool.map(get_interface_class_id, [parser] * 4))
+        parser.settings['test3'] = 'b'
+        second = set(pool.map(get_interface_class_id, [parser] * 4))
+    assert len(first) == len(second) == 1
+
+
+def make_parser(value):
+
+    class Parser(RegExpParser):
+        settings = {'test': 'a'}
+
+        @interface_property
+        def extra(self):
+            return value
+
+    return Parser()
+
+
+def test_restored_parsers_of_different_classes():
+
+    def restore_in_other_process(parser):
+        _, (cls, key, state) = parser.__reduce__()
+        return restore_parser(cls, (key[0] + 1, ) + key[1:], state)
+
+    restore_in_other_process(make_parser('A'))
+    assert restore_in_other_process(make_parser('B')).parse_all('a') == {'test': 'a', 'extra': 'B'}
+
+
+def test_parse_all_many_with_executor_instance():
+    contents = ['%s.%s' % (i, i) for i in range(10)]
+    with ProcessPoolExecutor(2) as pool:
+        results = list(SimpleParser().parse_all_many(contents, executor=pool))
+    assert results == [SimpleParser().parse_all(content) for content in contents]
+
+
+def test_interface():
+    parsed = SimpleParser().parse('1.2')
+    assert parsed.test4 == '1_4'
+    restored = pickle.loads(pickle.dumps(parsed))
+    assert restored.__dict__['test4'] == '1_4'
+    assert 'test' not in restored.__dict__
+    assert restored.parse_all() == parsed.parse_all()
+    assert restored.test_5('x') == 'Will not be included'
+
+
+def test_combined_interface():
+    parsed = EmptyValuesParser().parse('{"container": "1,2"}')
+    assert parsed.combined == '123-1,2'
+    restored = pickle.loads(pickle.dumps(parsed))
+    assert restored.__dict__['combined'] == '123-1,2'
+    assert restored.test == '1,2'
+    assert restored.parse_all() == parsed.parse_all()
+
+
+def test_interface_strip():
+    parser = RegExpParser({'test': r'(\s\d+\s)'})
+    parsed = parser.parse(' 1 ')
+    parsed.strip = True
+    assert pickle.loads(pickle.dumps(parsed)).test == '1'
+
+
+def test_interface_over_parsed_content():
+    parsed = JSONParser({'test': 'test'}).from_parsed({'test': 1})
+    assert pickle.loads(pickle.dumps(parsed)).test == 1
+    # Parsed content, which can't be pickled, is left out
+    parsed = JSONParser({'test': 'test'}).from_parsed({'test': 1, 'other': object()})
+    assert parsed.test == 1
+    assert pickle.loads(pickle.dumps(parsed)).test == 1
+
+
+@lxml_is_supported
+def test_interface_with_elements():
+    parser = XMLParser({
+        'id': 'string(//id)',
+        'elements': '//id',
+        'items': {'base': '//item', 'parser': XMLParser({'value': 'string(/item)'})},
+    })
+    parsed = parser.parse('<feed><id>1</id><item>a</item><item>b</item></feed>')
+    assert parsed.id == '1'
+    assert len(parsed.elements) == 1 and len(parsed.items) == 2
+    restored = pickle.loads(pickle.dumps(parsed))
+    assert restored.__dict__['id'] == '1'
+    assert 'elements' not in restored.__dict__ and 'items' not in restored.__dict__
+    assert restored.parse_all()['items'] == [{'value': 'a'}, {'value': 'b'}]
+
+
+@lxml_is_supported
+@pytest.mark.parametrize('parser_class, content', (
+    (HTMLParser, '<ul><li><a href="/1">first <br> link</a></li><li><a href="/2">second</a></li></ul>'),
+    (XMLParser, '<ul><li><a href="/1">first <br/> link</a></li><li><a href="/2">second</a></li></ul>'),
+))
+def test_sub_parser_item(parser_class, content):
+    parser = parser_class({
+        'items': {'base': '//li', 'parser': parser_class({'href': 'string(//a/@href)', 'text': 'string(//a)'})},
+    })
+    item = parser.parse(content).items[0]
+    restored = pickle.loads(pickle.dumps(item))
+    assert restored.parse_all() == item.parse_all() == {'href': '/1', 'text': 'first  link'}
+    # Parsed content is restored, not computed attributes only
+    restored = pickle.loads(pickle.dumps(parser.parse(content).items[1]))
+    assert restored.parse('string(//a)') == 'second'
+
+
+@lxml_is_supported
+def test_iterparse_results():
+    parser = XMLParser({'id': 'string(//id)'})
+    records = list(parser.iterparse(b'<feed><record><id>1</id></record></feed>', 'record'))
+    assert pickle.loads(pickle.dumps(records)) == records == [{'id': '1'}]
+
+
+def test_plain_interface():
+    with pytest.raises(TypeError):
+        pickle.dumps(JSONInterface('{}'))
@@ -0,0 +1,167 @@
+# coding: utf-8
+import os
+import pickle
+import subprocess
+import sys
+from io import StringIO
+
+import pytest
+
+from ._compat import patch
+from .conftest import SimpleParser
+from pyanyapi.decorators import interface_property
+from pyanyapi.parsers import JSONParser, RegExpParser, YAMLParser
+from pyanyapi.resultcache import ResultCache, get_content_key
+
+
+CONTENT = '{"container": {"test": "value"}}'
+
+
+@pytest.fixture
+def parser():
+    parser = JSONParser({'test': 'container > test'})
+    parser.result_cache = ResultCache(maxsize=2)
+    return parser
+
+
+def test_unchanged_content_is_not_parsed(parser):
+    assert parser.parse_all(CONTENT) == {'test': 'value'}
+    with patch.object(parser, 'parse') as parse:
+        assert parser.parse_all(CONTENT) == {'test': 'value'}
+        assert parser.parse_all(CONTENT) == {'test': 'value'}
+        assert not parse.called
+    # Text and bytes are different keys
+    assert parser.parse_all(CONTENT.encode('utf-8')) == {'test': 'value'}
+    stats = parser.result_cache.stats
+    assert (stats.hits, stats.misses) == (2, 2)
+
+
+def test_results_are_copied(parser):
+    parser.parse_all(CONTENT)['test'] = 'changed'
+    assert parser.parse_all(CONTENT) == {'test': 'value'}
+
+
+def test_settings_change(parser):
+    parser.parse_all(CONTENT)
+    parser.settings['test'] = 'container'
+    assert parser.parse_all(CONTENT) == {'test': {'test': 'value'}}
+    parser.strip = True
+    assert parser.get_fingerprint() != JSONParser({'test': 'container'}).get_fingerprint()
+
+
+def test_fingerprint():
+    assert RegExpParser({'test': 'a'}).get_fingerprint() == RegExpParser({'test': 'a'}).get_fingerprint()
+    assert RegExpParser({'test': 'a'}).get_fingerprint() != RegExpParser({'test': 'b'}).get_fingerprint()
+    assert RegExpParser({'test': 'a'}).get_fingerprint() != RegExpParser({'test': 'a'}, flags=2).get_fingerprint()
+    assert JSONParser({'test': 'a'}).get_fingerprint() != YAMLParser({'test': 'a'}).get_fingerprint()
+    assert SimpleParser().get_fingerprint() != RegExpParser(SimpleParser.settings).get_fingerprint()
+
+    class Parser(RegExpParser):
+
+        @interface_property
+        def test(self):
+            return 'other'
+
+    assert Parser().get_fingerprint() != RegExpParser().get_fingerprint()
+    combined = JSONParser({'test': 'a'}) & RegExpParser({'test': 'a'})
+    assert combined.get_fingerprint() != (JSONParser({'test': 'a'}) & RegExpParser({'test': 'b'})).get_fingerprint()
+
+
+def test_fingerprint_of_properties_code():
+
+    class First(RegExpParser):
+
+        @interface_property
+        def test(self):
+            return self.a
+
+    class Second(RegExpParser):
+
+        @interface_property
+        def test(self):
+            return self.b
+
+    Second.__qualname__ = First.__qualname__
+    assert First().get_fingerprint() != Second().get_fingerprint()
+
+
+def test_content_key_of_binary_strings():
+    content = u'ü'.encode('utf-8')
+    # On Python 2 `str` is one of string types
+    with patch('pyanyapi.resultcache.string_types', (str, bytes)):
+        assert get_content_key(content) == get_content_key(bytearray(content))
+    assert get_content_key(u'ü') != get_content_key(content)
+
+
+FINGERPRINT_SCRIPT = """
+from pyanyapi.resultcache import fingerprint
+
+
+def check(value):
+    return value in {'alpha', 'beta', 'gamma', 'delta', 'epsilon'}
+
+
+print(fingerprint([check, {'alpha', 'beta', 'gamma'}, frozenset(['delta', 'epsilon', 'zeta'])]))
+"""
+
+
+def test_fingerprint_of_sets_is_stable():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = set()
+    for seed in ('1', '2', '3'):
+        env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=root)
+        results.add(subprocess.check_output([sys.executable, '-c', FINGERPRINT_SCRIPT], env=env, cwd=root))
+    assert len(results) == 1
+
+
+def test_fingerprint_of_sub_parser_class():
+
+    class Item(RegExpParser):
+        settings = {'v': r'(\d)'}
+
+    parser = RegExpParser({'items': {'base': r'\w', 'parser': Item}})
+    before = parser.get_fingerprint()
+    Item.settings = {'v': r'(\d)(\d)'}
+    assert parser.get_fingerprint() != before
+
+
+def test_lru(parser):
+    for content in ('{"a": 1}', '{"a": 2}', '{"a": 3}'):
+        parser.parse_all(content)
+    assert len(parser.result_cache.memory) == 2
+    assert parser.result_cache.stats.evictions == 1
+
+
+def test_file_like_content_is_not_cached():
+    parser = JSONParser({'test': 'container > test'}, streaming=True)
+    parser.result_cache = ResultCache()
+    assert parser.parse_all(StringIO(CONTENT)) == {'test': 'value'}
+    assert len(parser.result_cache.memory) == 0
+
+
+def test_persistent_tier(tmpdir):
+    path = str(tmpdir.join('results.sqlite'))
+    parser = JSONParser({'test': 'container > test'})
+    parser.result_cache = ResultCache(path=path)
+    parser.parse_all(CONTENT)
+    parser.result_cache.close()
+
+    parser = JSONParser({'test': 'container > test'})
+    parser.result_cache = ResultCache(path=path)
+    with patch.object(parser, 'parse') as parse:
+        assert parser.parse_all(CONTENT) == {'test': 'value'}
+        assert not parse.called
+    assert parser.result_cache.disk_stats.hits == 1
+    parser.result_cache.clear()
+    assert parser.parse_all(CONTENT) == {'test': 'value'}
+    assert parser.result_cache.disk_stats.misses == 1
+
+
+def test_pickle(tmpdir):
+    parser = SimpleParser()
+    parser.result_cache = ResultCache(path=str(tmpdir.join('results.sqlite')))
+    parser.parse_all('1.2')
+    restored = pickle.loads(pickle.dumps(parser))
+    assert len(restored.result_cache.memory) == 0
+    assert restored.parse_all('1.2') == parser.parse_all('1.2')
+    assert restored.result_cache.disk_stats.hits == 1
@@ -0,0 +1,73 @@
+# coding: utf-8
+from io import BytesIO, StringIO
+
+import pytest
+import yaml
+
+from ._compat import patch
+from pyanyapi.exceptions import ResponseParseError
+from pyanyapi.interfaces import YAMLInterface
+from pyanyapi.parsers import YAMLParser
+
+
+STREAM = u'''container:
+    test: first
+---
+container:
+    test: second
+    items: [1, 2]
+---
+other: 3
+'''
+SETTINGS = {'test': 'container > test', 'second': 'container > items > 1'}
+EXPECTED = [
+    {'test': 'first', 'second': None},
+    {'test': 'second', 'second': 2},
+    {'test': None, 'second': None},
+]
+
+
+@pytest.fixture(params=('python', 'c'))
+def loader(request):
+    if request.param == 'python':
+        with patch.object(YAMLInterface, 'loader', yaml.SafeLoader):
+            yield
+    else:
+        if not yaml.__with_libyaml__:
+            pytest.skip('LibYAML is not available')
+        with patch.object(YAMLInterface, 'loader', yaml.CSafeLoader):
+            yield
+
+
+def test_parse(loader):
+    parser = YAMLParser(SETTINGS)
+    assert parser.get_interface_class().loader is YAMLInterface.loader
+    assert parser.parse_all(STREAM.split('---')[1]) == EXPECTED[1]
+
+
+def test_unsafe_tags(loader):
+    with pytest.raises(ResponseParseError):
+        YAMLParser(SETTINGS).parse('!!python/object/apply:os.system ["exit 0"]').test
+
+
+@pytest.mark.parametrize('source', (
+    lambda: STREAM,
+    lambda: STREAM.encode('utf-8'),
+    lambda: StringIO(STREAM),
+    lambda: BytesIO(STREAM.encode('utf-8')),
+))
+def test_iterparse(loader, source):
+    assert list(YAMLParser(SETTINGS).iterparse(source())) == EXPECTED
+
+
+def test_iterparse_is_lazy(loader):
+    records = YAMLParser(SETTINGS).iterparse(StringIO(STREAM + '--- [unclosed'))
+    assert next(records) == EXPECTED[0]
+    assert next(records) == EXPECTED[1]
+    assert next(records) == EXPECTED[2]
+    with pytest.raises(ResponseParseError):
+        next(records)
+
+
+def test_iterparse_empty(loader):
+    assert list(YAMLParser(SETTINGS).iterparse('')) == []